@@ -15,6 +15,9 @@ jwt = JWTManager()
 def create_app():
     app = Flask(__name__)
     
+    from app.json_provider import FastJSONProvider
+    app.json = FastJSONProvider(app)
+    
     # Configuration
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key')
     app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///finance.db')
@@ -28,6 +31,10 @@ def create_app():
     jwt.init_app(app)
     CORS(app)
     
+    # gzip/brotli negotiation for large and streamed responses
+    from app.compression import init_compression
+    init_compression(app)
+    
     # Create upload folder
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
     
@@ -39,6 +46,8 @@ def create_app():
     from app.routes.budget import budget_bp
     from app.routes.income import incomes_bp
     from app.routes.analytics import analytics_bp
+    from app.routes.export import export_bp
+    from app.routes.sync import sync_bp
     
     app.register_blueprint(auth_bp, url_prefix='/api')
     app.register_blueprint(expenses_bp, url_prefix='/api')
@@ -47,10 +56,19 @@ def create_app():
     app.register_blueprint(budget_bp, url_prefix='/api')
     app.register_blueprint(incomes_bp, url_prefix='/api')
     app.register_blueprint(analytics_bp, url_prefix='/api')
+    app.register_blueprint(export_bp, url_prefix='/api')
+    app.register_blueprint(sync_bp, url_prefix='/api')
     
-    # Create tables
+    # Create missing tables, then evolve existing ones (see app/migrations.py)
     with app.app_context():
         db.create_all()
+        
+        from app.migrations import run_migrations
+        run_migrations(db)
+    
+    # CLI maintenance jobs
+    from app.commands import register_commands
+    register_commands(app)
     
     @app.route('/')
     def index():
@@ -0,0 +1,103 @@
+import click
+
+from app import db
+
+
+def _user_ids(user_id):
+    """The given user, or every user when None."""
+    from app.models import User
+
+    if user_id is not None:
+        return [user_id]
+    return [uid for (uid,) in db.session.query(User.id)]
+
+
+def register_commands(app):
+    """Attach maintenance jobs to the `flask` CLI."""
+
+    @app.cli.command('recategorize')
+    @click.option('--user-id', type=int, default=None, help='Limit the backfill to one user (default: all users).')
+    @click.option('--chunk-size', type=int, default=5000, show_default=True, help='Expenses per batch/transaction.')
+    @click.option('--min-confidence', type=float, default=0.0, show_default=True, help='Skip predictions below this confidence.')
+    @click.option('--reset', is_flag=True, help='Ignore the saved checkpoint and start from the first expense.')
+    def recategorize(user_id, chunk_size, min_confidence, reset):
+        """Re-run the categorizer over stored expenses (resumable)."""
+        from app.services.backfill_service import RecategorizationBackfill
+
+        def report(progress):
+            click.echo(
+                f"[{progress['job']}] cursor={progress['last_expense_id']} "
+                f"processed={progress['processed']} updated={progress['updated']} "
+                f"rate={progress['rows_per_second']} rows/s"
+            )
+
+        job = RecategorizationBackfill(
+            db,
+            user_id=user_id,
+            chunk_size=chunk_size,
+            min_confidence=min_confidence,
+            progress=report,
+        )
+        result = job.run(reset=reset)
+        click.echo(f"Done: processed={result['processed']} updated={result['updated']}")
+
+    @app.cli.command('forecast-batch')
+    def forecast_batch():
+        """Precompute next month's spending forecast for every user."""
+        from app.services.forecast_batch import ForecastBatchJob
+
+        result = ForecastBatchJob(db).run()
+        click.echo(f"Stored forecasts for {result['users']} users in {result['seconds']}s")
+
+    @app.cli.command('rebuild-rollups')
+    @click.option('--user-id', type=int, default=None, help='Rebuild one user (default: all users).')
+    def rebuild_rollups(user_id):
+        """Recompute running month totals and budget alerts from the ledger."""
+        from app.services.data_version import bump_data_version
+        from app.services.prediction_service import PredictionService
+        from app.services.rollup_service import rebuild_rollups as rebuild
+
+        rows = rebuild(db, user_id=user_id)
+        user_ids = _user_ids(user_id)
+        for uid in user_ids:
+            PredictionService.evaluate_budget_alerts(uid, db)
+            # Dashboard responses are cached per data version
+            bump_data_version(uid, db)
+        db.session.commit()
+        click.echo(f"Rebuilt {rows} rollup rows for {len(user_ids)} users")
+
+    @app.cli.command('score-anomalies')
+    @click.option('--user-id', type=int, default=None, help='Rescore one user (default: all users).')
+    def score_anomalies(user_id):
+        """Recompute per-category amount statistics and anomaly scores from the ledger."""
+        from app.services.anomaly_service import backfill
+        from app.services.data_version import bump_data_version
+
+        scored = backfill(db, user_id=user_id)
+        for uid in _user_ids(user_id):
+            bump_data_version(uid, db)
+        db.session.commit()
+        click.echo(f"Scored {scored} expenses")
+
+    @app.cli.command('insights-batch')
+    @click.option('--workers', type=int, default=None, help='Worker processes (default: CPU count).')
+    @click.option('--shard-size', type=int, default=200, show_default=True, help='Users per worker task.')
+    def insights_batch(workers, shard_size):
+        """Precompute this month's AI insights for every user on a process pool."""
+        from app.services.insights_batch import InsightsBatchJob
+
+        result = InsightsBatchJob(db, workers=workers, shard_size=shard_size).run()
+        click.echo(
+            f"Stored insights for {result['stored']}/{result['users']} users "
+            f"({result['failed']} failed) in {result['seconds']}s"
+        )
+
+    @app.cli.command('migrations')
+    def migrations():
+        """List schema migrations and whether each is applied."""
+        from app.migrations import MIGRATIONS, applied_versions
+
+        with db.engine.connect() as conn:
+            done = applied_versions(conn)
+        for version, name, _ in MIGRATIONS:
+            click.echo(f"{version:>4}  {'applied' if version in done else 'pending'}  {name}")
@@ -0,0 +1,118 @@
+import gzip
+import zlib
+
+from flask import request
+
+from app.services.data_version import VersionedCache
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+# Only text-like payloads shrink; already-compressed types (images,
+# application/gzip exports) pass through untouched
+COMPRESSIBLE_MIMETYPES = frozenset({
+    'application/json',
+    'application/x-ndjson',
+    'text/csv',
+    'text/plain',
+    'text/html',
+})
+
+DEFAULTS = {
+    'COMPRESS_MIN_SIZE': 1024,  # bytes; smaller bodies cost more to compress than they save
+    'COMPRESS_GZIP_LEVEL': 6,
+    'COMPRESS_BROTLI_QUALITY': 5,
+    'COMPRESS_CACHE_SIZE': 256,  # compressed bodies kept per (ETag, encoding)
+    'COMPRESS_CACHE_MAX_BYTES': 1024 * 1024,  # larger bodies are recompressed each time
+    'COMPRESS_CACHE_TOTAL_BYTES': 16 * 1024 * 1024,  # all cached bodies together
+}
+
+
+def _encodings():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def _compress(body, encoding, config):
+    if encoding == 'br':
+        return brotli.compress(body, quality=config['COMPRESS_BROTLI_QUALITY'])
+    return gzip.compress(body, compresslevel=config['COMPRESS_GZIP_LEVEL'], mtime=0)
+
+
+def _compress_stream(chunks, encoding, config):
+    """Compress a streamed body chunk by chunk, flushing so each part goes out as it is produced."""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=config['COMPRESS_BROTLI_QUALITY'])
+        for chunk in chunks:
+            data = compressor.process(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+            data += compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+        return
+
+    compressor = zlib.compressobj(config['COMPRESS_GZIP_LEVEL'], zlib.DEFLATED, 31)  # wbits=31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+        data += compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def init_compression(app):
+    """
+    Compress responses negotiated through Accept-Encoding (brotli when the
+    `brotli` package is installed, else gzip).
+
+    Buffered bodies are compressed above COMPRESS_MIN_SIZE; streamed bodies
+    (exports) are compressed as they are generated. Responses carrying an
+    ETag reuse a cached compressed body, since an unchanged ETag means an
+    unchanged payload, and their ETag becomes weak because the bytes on the
+    wire differ per encoding. The cache evicts least recently used bodies
+    beyond COMPRESS_CACHE_SIZE entries or COMPRESS_CACHE_TOTAL_BYTES in all.
+    """
+    for key, value in DEFAULTS.items():
+        app.config.setdefault(key, value)
+    cache = VersionedCache(
+        maxsize=app.config['COMPRESS_CACHE_SIZE'],
+        maxbytes=app.config['COMPRESS_CACHE_TOTAL_BYTES'],
+    )
+
+    @app.after_request
+    def compress_response(response):
+        if (
+            response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or response.status_code < 200
+            or response.status_code in (204, 206, 304)
+            or 'Content-Encoding' in response.headers
+            or response.direct_passthrough
+        ):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = request.accept_encodings.best_match(_encodings())
+        if encoding is None:
+            return response
+        config = app.config
+
+        if response.is_streamed:
+            response.response = _compress_stream(response.response, encoding, config)
+            response.headers.pop('Content-Length', None)
+        else:
+            etag, weak = response.get_etag()
+            body = cache.get((etag, encoding), etag) if etag else None
+            if body is None:
+                raw = response.get_data()
+                if len(raw) < config['COMPRESS_MIN_SIZE']:
+                    return response
+                body = _compress(raw, encoding, config)
+                if etag and len(body) <= config['COMPRESS_CACHE_MAX_BYTES']:
+                    cache.set((etag, encoding), etag, body)
+            response.set_data(body)
+            if etag and not weak:
+                response.set_etag(etag, weak=True)
+
+        response.headers['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,53 @@
+from app.models import Budget, CategoryBudget, Expense, Income, Subscription
+
+# Columns each list endpoint can return, in to_dict order. Values are
+# passed to the JSON provider as loaded: it writes dates as ISO 8601 and
+# `items` is already decoded by its JSON column type.
+FIELDS = {
+    Expense: ('id', 'user_id', 'store', 'amount', 'category', 'date', 'items', 'raw_ocr_text', 'created_at'),
+    Income: ('id', 'user_id', 'source', 'category', 'amount', 'date', 'is_recurring', 'notes', 'created_at'),
+    Subscription: ('id', 'user_id', 'name', 'amount', 'frequency', 'renewal_date', 'created_at'),
+    Budget: ('id', 'user_id', 'monthly_limit', 'currency', 'updated_at'),
+    CategoryBudget: ('id', 'user_id', 'category', 'monthly_limit', 'created_at', 'updated_at'),
+}
+
+
+def parse_fields(args, model):
+    """
+    Requested fields from a `fields=a,b,c` argument, with `id` always first,
+    or None when the request wants full objects. Raises ValueError on
+    unknown field names.
+    """
+    raw = args.get('fields')
+    if not raw:
+        return None
+    allowed = FIELDS[model]
+    fields = ['id']
+    for name in (part.strip() for part in raw.split(',')):
+        if not name or name in fields:
+            continue
+        if name not in allowed:
+            raise ValueError(f"Unknown field '{name}'. Allowed: {', '.join(allowed)}")
+        fields.append(name)
+    return fields
+
+
+def select_fields(query, model, fields=None, extra=()):
+    """
+    Narrow an ORM query to tuple rows of the requested columns (all of the
+    model's FIELDS when `fields` is None). `extra` columns (e.g. the
+    pagination key) are selected after them and are not serialized.
+    """
+    fields = fields or FIELDS[model]
+    names = list(fields) + [name for name in extra if name not in fields]
+    return query.with_entities(*(getattr(model, name) for name in names))
+
+
+def serialize_rows(rows, model, fields=None):
+    """
+    Dicts of the requested fields (all of the model's FIELDS by default)
+    from tuple rows, without ORM objects. Trailing extra columns are
+    dropped by zip.
+    """
+    names = tuple(fields or FIELDS[model])
+    return [dict(zip(names, row)) for row in rows]
@@ -0,0 +1,47 @@
+import hashlib
+from datetime import date
+from functools import wraps
+
+from flask import make_response, request
+from flask_jwt_extended import get_jwt_identity
+
+from app import db
+from app.services.data_version import get_data_version_state
+
+
+def conditional_get(view):
+    """
+    ETag / Last-Modified support for per-user read endpoints.
+
+    The validator is derived from the user's data version (bumped by every
+    write route) plus the request path, query string and today's date, since
+    several endpoints default to the current month. A matching
+    If-None-Match gets a 304 before the view runs, so unchanged screens cost
+    one primary-key lookup. Apply below `@jwt_required()`.
+    """
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        user_id = get_jwt_identity()
+        version, updated_at = get_data_version_state(user_id, db)
+        key = f'{user_id}:{version}:{request.path}:{request.query_string.decode()}:{date.today().isoformat()}'
+        etag = hashlib.sha1(key.encode()).hexdigest()
+
+        # Weak match: compressed responses carry the ETag as W/"..."
+        if request.if_none_match.contains_weak(etag):
+            response = make_response('', 304)
+            weak = not request.if_none_match.is_strong(etag)
+        else:
+            weak = False
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+
+        response.set_etag(etag, weak=weak)
+        if updated_at is not None:
+            response.last_modified = updated_at
+        # Clients may store the response but must revalidate before reuse
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+
+    return wrapper
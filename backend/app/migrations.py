@@ -0,0 +1,178 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, insert, select, text
+from sqlalchemy.exc import IntegrityError
+
+# Bookkeeping lives outside db.metadata so create_all never touches it
+_metadata = MetaData()
+
+schema_migrations = Table(
+    'schema_migrations',
+    _metadata,
+    Column('version', Integer, primary_key=True),
+    Column('name', String(100), nullable=False),
+    Column('applied_at', DateTime, nullable=False),
+)
+
+MIGRATIONS = []
+
+# Versions registered with data=True
+_DATA_MIGRATIONS = set()
+
+
+def migration(version, name, data=False):
+    """
+    Register `fn(conn)` as schema migration `version`; versions apply in
+    order. Data migrations (data=True) get `fn(db)` instead and run in the
+    ORM session, so they can reuse the services that maintain derived data.
+    """
+    def register(fn):
+        MIGRATIONS.append((version, name, fn))
+        MIGRATIONS.sort(key=lambda entry: entry[0])
+        if data:
+            _DATA_MIGRATIONS.add(version)
+        return fn
+    return register
+
+
+def _statements(conn, *statements):
+    for statement in statements:
+        conn.execute(text(statement))
+
+
+# `db.create_all()` creates missing tables with their current indexes but
+# never alters an existing table, so every index added after a table first
+# shipped needs a migration. The DDL is idempotent: on a fresh database the
+# model already declared these and the migration only records its version.
+
+@migration(1, 'composite_date_indexes')
+def _composite_date_indexes(conn):
+    # (user_id, date, id) serves date ranges and keyset pages per user
+    _statements(
+        conn,
+        'CREATE INDEX IF NOT EXISTS ix_expenses_user_date_id ON expenses (user_id, date, id)',
+        'CREATE INDEX IF NOT EXISTS ix_incomes_user_date_id ON incomes (user_id, date, id)',
+    )
+
+
+@migration(2, 'expense_category_index')
+def _expense_category_index(conn):
+    _statements(
+        conn,
+        'CREATE INDEX IF NOT EXISTS ix_expenses_user_category_date ON expenses (user_id, category, date)',
+    )
+
+
+@migration(3, 'subscription_user_index')
+def _subscription_user_index(conn):
+    _statements(
+        conn,
+        'CREATE INDEX IF NOT EXISTS ix_subscriptions_user_renewal ON subscriptions (user_id, renewal_date)',
+    )
+
+
+@migration(4, 'expenses_search')
+def _expenses_search(conn):
+    from app.services.search_service import create_search_index
+    create_search_index(conn)
+
+
+@migration(5, 'expense_items_json')
+def _expense_items_json(conn):
+    # SQLite keeps JSON as text, which the JSON column type reads as is;
+    # Postgres needs the column converted, and the search index rebuilt on it
+    if conn.dialect.name != 'postgresql':
+        return
+    data_type = conn.execute(text(
+        "SELECT data_type FROM information_schema.columns "
+        "WHERE table_name = 'expenses' AND column_name = 'items'"
+    )).scalar()
+    if data_type == 'json':
+        return
+    _statements(
+        conn,
+        'DROP INDEX IF EXISTS ix_expenses_search',
+        'ALTER TABLE expenses ALTER COLUMN items TYPE JSON USING items::json',
+    )
+    from app.services.search_service import create_search_index
+    create_search_index(conn)
+
+
+@migration(6, 'search_item_names')
+def _search_item_names(conn):
+    # The first search index covered the raw JSON of `items`, so its keys
+    # ("name", "price") matched every receipt; rebuild it over item names
+    from app.services.search_service import create_search_index, drop_search_index
+    drop_search_index(conn)
+    create_search_index(conn)
+
+
+@migration(7, 'feedback_expense_index')
+def _feedback_expense_index(conn):
+    _statements(
+        conn,
+        'CREATE INDEX IF NOT EXISTS ix_categorization_feedback_expense ON categorization_feedback (expense_id)',
+    )
+
+
+@migration(8, 'rebuild_derived_data', data=True)
+def _rebuild_derived_data(db):
+    # Tables of derived data start empty on a database that already holds a
+    # ledger; fill them from it as `flask rebuild-rollups` and
+    # `flask score-anomalies` would
+    from app.models import Budget, CategoryBudget, User
+    from app.services import anomaly_service
+    from app.services.data_version import bump_data_version
+    from app.services.prediction_service import PredictionService
+    from app.services.rollup_service import rebuild_rollups
+
+    rebuild_rollups(db)
+    # Per-category amount windows and scores, so new expenses are scored
+    # against the existing history
+    anomaly_service.backfill(db)
+    # Alerts are read as stored, so evaluate the current month from the
+    # rebuilt totals for everyone with a budget
+    budgeted = db.session.query(Budget.user_id).union(db.session.query(CategoryBudget.user_id))
+    for (user_id,) in budgeted.all():
+        PredictionService.evaluate_budget_alerts(user_id, db)
+    for (user_id,) in db.session.query(User.id).all():
+        bump_data_version(user_id, db)
+
+
+def applied_versions(conn):
+    return set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+
+def run_migrations(db):
+    """
+    Apply pending migrations, each in its own transaction together with its
+    version row. Returns the (version, name) pairs applied by this call.
+    Safe to run from several processes at once: a process that loses the
+    race for a version rolls back and leaves it to the winner.
+    """
+    _metadata.create_all(db.engine)
+    with db.engine.connect() as conn:
+        done = applied_versions(conn)
+
+    applied = []
+    for version, name, fn in MIGRATIONS:
+        if version in done:
+            continue
+        record = insert(schema_migrations).values(version=version, name=name, applied_at=datetime.utcnow())
+        try:
+            if version in _DATA_MIGRATIONS:
+                fn(db)
+                db.session.execute(record)
+                db.session.commit()
+            else:
+                with db.engine.begin() as conn:
+                    fn(conn)
+                    conn.execute(record)
+        except IntegrityError:
+            db.session.rollback()
+            continue
+        except Exception:
+            db.session.rollback()
+            raise
+        applied.append((version, name))
+    return applied
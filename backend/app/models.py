@@ -39,12 +39,18 @@ class Expense(db.Model):
     amount = db.Column(db.Float, nullable=False)
     category = db.Column(db.String(50), nullable=False)
     date = db.Column(db.Date, nullable=False)
-    items = db.Column(db.Text)  # JSON string
+    items = db.Column(db.JSON(none_as_null=True))  # list of receipt line items
     raw_ocr_text = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        # Serves date-range scans and (date, id) keyset pagination per user
+        db.Index('ix_expenses_user_date_id', 'user_id', 'date', 'id'),
+        # Category-filtered lists and per-category date ranges
+        db.Index('ix_expenses_user_category_date', 'user_id', 'category', 'date'),
+    )
+    
     def to_dict(self):
-        import json
         return {
             'id': self.id,
             'user_id': self.user_id,
@@ -52,7 +58,7 @@ class Expense(db.Model):
             'amount': self.amount,
             'category': self.category,
             'date': self.date.isoformat(),
-            'items': json.loads(self.items) if self.items else None,
+            'items': self.items or None,
             'raw_ocr_text': self.raw_ocr_text,
             'created_at': self.created_at.isoformat()
         }
@@ -68,6 +74,10 @@ class Subscription(db.Model):
     renewal_date = db.Column(db.Date, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('ix_subscriptions_user_renewal', 'user_id', 'renewal_date'),
+    )
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -112,6 +122,10 @@ class Income(db.Model):
     notes = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('ix_incomes_user_date_id', 'user_id', 'date', 'id'),
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -162,6 +176,11 @@ class CategorizationFeedback(db.Model):
     confidence = db.Column(db.Float)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        # Per-expense lookups: the backfill's "already corrected" check
+        db.Index('ix_categorization_feedback_expense', 'expense_id'),
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -172,3 +191,220 @@ class CategorizationFeedback(db.Model):
             'confidence': self.confidence,
             'created_at': self.created_at.isoformat(),
         }
+
+
+class BackfillCheckpoint(db.Model):
+    __tablename__ = 'backfill_checkpoints'
+
+    id = db.Column(db.Integer, primary_key=True)
+    job_name = db.Column(db.String(100), nullable=False, unique=True)
+    last_expense_id = db.Column(db.Integer, nullable=False, default=0)
+    processed = db.Column(db.Integer, nullable=False, default=0)
+    updated = db.Column(db.Integer, nullable=False, default=0)
+    completed_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'job_name': self.job_name,
+            'last_expense_id': self.last_expense_id,
+            'processed': self.processed,
+            'updated': self.updated,
+            'completed_at': self.completed_at.isoformat() if self.completed_at else None,
+            'updated_at': self.updated_at.isoformat(),
+        }
+
+
+class UserDataVersion(db.Model):
+    __tablename__ = 'user_data_versions'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    # Last sync change-log sequence handed out (see sync_service)
+    sync_sequence = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'user_id': self.user_id,
+            'version': self.version,
+            'updated_at': self.updated_at.isoformat(),
+        }
+
+
+class SpendingForecast(db.Model):
+    __tablename__ = 'spending_forecasts'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, unique=True)
+    predicted_amount = db.Column(db.Float, nullable=False, default=0.0)
+    confidence = db.Column(db.Float, nullable=False, default=0.0)
+    based_on_months = db.Column(db.Integer, nullable=False, default=0)
+    historical_average = db.Column(db.Float)
+    data_version = db.Column(db.Integer, nullable=False, default=0)
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        result = {
+            'predicted_amount': self.predicted_amount,
+            'confidence': self.confidence,
+            'based_on_months': self.based_on_months,
+        }
+        if self.based_on_months:
+            result['historical_average'] = self.historical_average
+        return result
+
+
+class MonthlyRollup(db.Model):
+    __tablename__ = 'monthly_rollups'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    month = db.Column(db.Date, nullable=False)  # first day of the month
+    category = db.Column(db.String(50), nullable=False)
+    kind = db.Column(db.String(10), nullable=False, default='expense')  # expense, income
+    total = db.Column(db.Float, nullable=False, default=0.0)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'month', 'category', 'kind', name='uq_monthly_rollup'),
+    )
+
+    def to_dict(self):
+        return {
+            'user_id': self.user_id,
+            'month': self.month.isoformat(),
+            'category': self.category,
+            'kind': self.kind,
+            'total': self.total,
+            'count': self.count,
+        }
+
+
+class BudgetAlert(db.Model):
+    __tablename__ = 'budget_alerts'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    month = db.Column(db.Date, nullable=False)
+    category = db.Column(db.String(50))  # None for the overall monthly budget
+    type = db.Column(db.String(10), nullable=False)  # danger, warning, info
+    message = db.Column(db.String(255), nullable=False)
+    percentage = db.Column(db.Float, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_budget_alerts_user_month', 'user_id', 'month'),
+    )
+
+    def to_dict(self):
+        result = {
+            'type': self.type,
+            'message': self.message,
+            'percentage': self.percentage,
+        }
+        if self.category:
+            result['category'] = self.category
+        return result
+
+
+class CategoryAmountStats(db.Model):
+    __tablename__ = 'category_amount_stats'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    category = db.Column(db.String(50), nullable=False)
+    window = db.Column(db.Text, nullable=False, default='[]')  # JSON list of recent amounts, oldest first
+    median = db.Column(db.Float)
+    mad = db.Column(db.Float)
+    count = db.Column(db.Integer, nullable=False, default=0)  # expenses seen, including those out of the window
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'category', name='uq_category_amount_stats'),
+    )
+
+    def to_dict(self):
+        return {
+            'category': self.category,
+            'median': self.median,
+            'mad': self.mad,
+            'count': self.count,
+        }
+
+
+class ExpenseAnomaly(db.Model):
+    __tablename__ = 'expense_anomalies'
+
+    id = db.Column(db.Integer, primary_key=True)
+    expense_id = db.Column(db.Integer, db.ForeignKey('expenses.id', ondelete='CASCADE'), nullable=False, unique=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    category = db.Column(db.String(50), nullable=False)
+    score = db.Column(db.Float)  # robust z-score; None while the category has too little history
+    median = db.Column(db.Float)
+    mad = db.Column(db.Float)
+    is_anomaly = db.Column(db.Boolean, nullable=False, default=False)
+    scored_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_expense_anomalies_user_flag', 'user_id', 'is_anomaly'),
+    )
+
+    def to_dict(self):
+        return {
+            'expense_id': self.expense_id,
+            'category': self.category,
+            'score': round(self.score, 2) if self.score is not None else None,
+            'median': self.median,
+            'is_anomaly': self.is_anomaly,
+        }
+
+
+class InsightsSnapshot(db.Model):
+    __tablename__ = 'insights_snapshots'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, unique=True)
+    year = db.Column(db.Integer, nullable=False)
+    month = db.Column(db.Integer, nullable=False)
+    payload = db.Column(db.Text, nullable=False)  # JSON /ai-insights response
+    data_version = db.Column(db.Integer, nullable=False, default=0)
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'user_id': self.user_id,
+            'year': self.year,
+            'month': self.month,
+            'data_version': self.data_version,
+            'computed_at': self.computed_at.isoformat(),
+        }
+
+
+class SyncChange(db.Model):
+    __tablename__ = 'sync_changes'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    # Per-user position in commit order; clients sync from the last one seen
+    sequence = db.Column(db.Integer, nullable=False)
+    entity = db.Column(db.String(20), nullable=False)  # expenses, incomes, subscriptions, budgets, category_budgets
+    entity_id = db.Column(db.Integer, nullable=False)
+    deleted = db.Column(db.Boolean, nullable=False, default=False)
+    changed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'sequence', name='uq_sync_changes_user_sequence'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'sequence': self.sequence,
+            'entity': self.entity,
+            'entity_id': self.entity_id,
+            'deleted': self.deleted,
+            'changed_at': self.changed_at.isoformat(),
+        }
@@ -0,0 +1,89 @@
+import base64
+import json
+from datetime import date
+
+from sqlalchemy import tuple_
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+
+def encode_cursor(day, row_id):
+    """Opaque token for the position after the row with this (date, id)."""
+    raw = json.dumps({'d': day.isoformat(), 'i': row_id}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """(date, id) from a cursor token; raises ValueError when it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        data = json.loads(raw)
+        return date.fromisoformat(data['d']), int(data['i'])
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError('Invalid cursor') from e
+
+
+def encode_offset(offset):
+    """Opaque token for the position `offset` rows into a ranked result."""
+    raw = json.dumps({'o': offset}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_offset(token):
+    """Offset from a ranked-result token; raises ValueError when it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        offset = int(json.loads(raw)['o'])
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError('Invalid cursor') from e
+    if offset < 0:
+        raise ValueError('Invalid cursor')
+    return offset
+
+
+def page_args(args, ranked=False):
+    """
+    (limit, cursor) from request args, or None when the request does not ask
+    for pagination. Ranked results (search) use offset cursors instead of
+    (date, id) ones. Raises ValueError on invalid values.
+    """
+    if 'limit' not in args and 'cursor' not in args:
+        return None
+    # Parsed by hand: args.get(type=int) would quietly fall back to the default
+    try:
+        limit = int(args.get('limit') or DEFAULT_LIMIT)
+    except ValueError:
+        limit = 0
+    if limit < 1:
+        raise ValueError('limit must be a positive integer')
+    decode = decode_offset if ranked else decode_cursor
+    cursor = decode(args['cursor']) if args.get('cursor') else None
+    return min(limit, MAX_LIMIT), cursor
+
+
+def keyset_page(query, model, limit, cursor=None):
+    """
+    One page of `query` newest first on (date, id), which the
+    (user_id, date, id) indexes serve without scanning earlier pages.
+    Returns (rows, next_cursor) where next_cursor is None on the last page.
+    """
+    if cursor is not None:
+        query = query.filter(tuple_(model.date, model.id) < tuple_(*cursor))
+    rows = query.order_by(model.date.desc(), model.id.desc()).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1].date, rows[-1].id)
+
+
+def offset_page(query, limit, offset=None):
+    """
+    One page of an already ordered query (e.g. by search rank), which has no
+    stable key to seek on. Returns (rows, next_cursor) like keyset_page.
+    """
+    offset = offset or 0
+    rows = query.offset(offset).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    return rows[:limit], encode_offset(offset + limit)
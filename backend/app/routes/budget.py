@@ -2,11 +2,16 @@ from flask import Blueprint, request, jsonify
 from app import db
 from app.models import Budget, CategoryBudget
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.http_cache import conditional_get
+from app.services.data_version import bump_data_version
+from app.services import sync_service
+from app.services.prediction_service import PredictionService
 
 budget_bp = Blueprint('budget', __name__)
 
 @budget_bp.route('/budget', methods=['GET'])
 @jwt_required()
+@conditional_get
 def get_budget():
     """Get budget for authenticated user"""
     try:
@@ -48,6 +53,9 @@ def update_budget():
             )
             db.session.add(budget)
         
+        sync_service.record(db, budget)
+        PredictionService.evaluate_budget_alerts(user_id, db)
+        bump_data_version(user_id, db)
         db.session.commit()
         
         return jsonify(budget.to_dict()), 200
@@ -59,6 +67,7 @@ def update_budget():
 
 @budget_bp.route('/budget/categories', methods=['GET'])
 @jwt_required()
+@conditional_get
 def get_category_budgets():
     """Get per-category budgets for the authenticated user."""
     try:
@@ -87,6 +96,7 @@ def upsert_category_budgets():
             return jsonify({'message': 'category_budgets must be a non-empty list'}), 400
 
         # Upsert each category budget
+        changed = []
         for item in items:
             category = item.get('category')
             limit = item.get('monthly_limit')
@@ -103,7 +113,11 @@ def upsert_category_budgets():
                     monthly_limit=float(limit),
                 )
                 db.session.add(row)
+            changed.append(row)
 
+        sync_service.record(db, *changed)
+        PredictionService.evaluate_budget_alerts(user_id, db)
+        bump_data_version(user_id, db)
         db.session.commit()
 
         rows = CategoryBudget.query.filter_by(user_id=user_id).all()
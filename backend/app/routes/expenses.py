@@ -2,17 +2,37 @@ from flask import Blueprint, request, jsonify
 from app import db
 from app.models import Expense, CategorizationFeedback
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.fieldsets import parse_fields, select_fields, serialize_rows
+from app.http_cache import conditional_get
+from app.pagination import keyset_page, offset_page, page_args
+from app.services.merchant_index import get_user_merchant_index
+from app.services.data_version import bump_data_version
+from app.services.prediction_service import PredictionService
+from app.services import anomaly_service, bulk_service, import_service, rollup_service, search_service, sync_service
 from datetime import datetime
-import json
 
 expenses_bp = Blueprint('expenses', __name__)
 
 @expenses_bp.route('/expenses', methods=['GET'])
 @jwt_required()
+@conditional_get
 def get_expenses():
-    """Get all expenses for authenticated user with optional filters"""
+    """Get all expenses for authenticated user with optional filters
+
+    Passing `limit` and/or `cursor` returns one page, newest first, with a
+    `next_cursor` token for the following page. `fields=store,amount,...`
+    returns only those columns (plus `id`). `q=...` restricts the list to
+    expenses whose store, items or receipt text match every word, best
+    match first.
+    """
     try:
         user_id = get_jwt_identity()
+        terms = search_service.search_terms(request.args.get('q'))
+        try:
+            page = page_args(request.args, ranked=bool(terms))
+            fields = parse_fields(request.args, Expense)
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
         
         # Build query
         query = Expense.query.filter_by(user_id=user_id)
@@ -30,11 +50,30 @@ def get_expenses():
         if end_date:
             query = query.filter(Expense.date <= datetime.fromisoformat(end_date))
         
-        # Order by date descending
-        expenses = query.order_by(Expense.date.desc()).all()
+        # Full-text search: ranked order, so pages are offsets into the ranking
+        if terms:
+            query = search_service.apply_search(query, db, terms)
+        
+        # Tuple rows of the requested columns (all by default), no ORM objects
+        query = select_fields(query, Expense, fields, extra=('date',))
+        
+        if page is not None:
+            if terms:
+                expenses, next_cursor = offset_page(query, *page)
+            else:
+                expenses, next_cursor = keyset_page(query, Expense, *page)
+            return jsonify({
+                'expenses': serialize_rows(expenses, Expense, fields),
+                'next_cursor': next_cursor,
+            }), 200
+        
+        # Order by date descending (search results keep their rank order)
+        if not terms:
+            query = query.order_by(Expense.date.desc())
+        expenses = query.all()
         
         return jsonify({
-            'expenses': [expense.to_dict() for expense in expenses]
+            'expenses': serialize_rows(expenses, Expense, fields)
         }), 200
         
     except Exception as e:
@@ -60,19 +99,64 @@ def create_expense():
             amount=float(data['amount']),
             category=data['category'],
             date=datetime.fromisoformat(data['date'].split('T')[0]),
-            items=json.dumps(data.get('items')) if data.get('items') else None,
+            items=data.get('items') or None,
             raw_ocr_text=data.get('raw_ocr_text')
         )
         
         db.session.add(expense)
+        rollup_service.record_expense(db, expense)
+        anomaly = anomaly_service.record_expense(db, expense)
+        sync_service.record(db, expense)
+        PredictionService.evaluate_budget_alerts(user_id, db, rollup_service.month_start(expense.date))
+        bump_data_version(user_id, db)
         db.session.commit()
         
-        return jsonify(expense.to_dict()), 201
+        # Keep the merchant index current for OCR normalization
+        get_user_merchant_index(db, user_id).add(expense.store)
+        
+        return jsonify({**expense.to_dict(), 'anomaly': anomaly}), 201
         
     except Exception as e:
         db.session.rollback()
         return jsonify({'message': f'Failed to create expense: {str(e)}'}), 500
 
+@expenses_bp.route('/expenses/import', methods=['POST'])
+@jwt_required()
+def import_expenses():
+    """Bulk import expenses from a CSV or OFX bank statement upload.
+
+    The file goes in the `file` form field; the format is taken from the
+    `format` field or the file extension. For a CSV with one signed amount
+    column, `sign` says how spending is written: `negative` (bank
+    statements, the default) or `positive` (card exports); the other side
+    is skipped as income. Returns counts of imported, duplicate and skipped
+    (credit) rows plus per-row errors.
+    """
+    try:
+        user_id = get_jwt_identity()
+        upload = request.files.get('file')
+        if upload is None or upload.filename == '':
+            return jsonify({'message': 'No file uploaded'}), 400
+        
+        fmt = (request.form.get('format') or upload.filename.rsplit('.', 1)[-1]).lower()
+        sign = 'negative'
+        if fmt in ('ofx', 'qfx'):
+            rows = import_service.parse_ofx(upload.stream)
+        elif fmt == 'csv':
+            rows = import_service.parse_csv(upload.stream)
+            sign = request.form.get('sign', 'negative')
+            if sign not in import_service.SIGN_CONVENTIONS:
+                return jsonify({'message': 'sign must be negative or positive'}), 400
+        else:
+            return jsonify({'message': 'Unsupported format. Upload a CSV or OFX file'}), 400
+        
+        report = import_service.ExpenseImport(db, user_id, sign=sign).run(rows)
+        return jsonify(report), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': f'Failed to import expenses: {str(e)}'}), 500
+
 @expenses_bp.route('/expenses/<int:expense_id>', methods=['DELETE'])
 @jwt_required()
 def delete_expense(expense_id):
@@ -84,7 +168,13 @@ def delete_expense(expense_id):
         if not expense:
             return jsonify({'message': 'Expense not found'}), 404
         
+        rollup_service.record_expense(db, expense, sign=-1)
+        anomaly_service.forget_expense(db, expense.id)
+        CategorizationFeedback.query.filter_by(expense_id=expense.id).delete(synchronize_session=False)
+        PredictionService.evaluate_budget_alerts(user_id, db, rollup_service.month_start(expense.date))
+        sync_service.record(db, expense, deleted=True)
         db.session.delete(expense)
+        bump_data_version(user_id, db)
         db.session.commit()
         
         return jsonify({'message': 'Expense deleted successfully'}), 200
@@ -94,6 +184,61 @@ def delete_expense(expense_id):
         return jsonify({'message': f'Failed to delete expense: {str(e)}'}), 500
 
 
+@expenses_bp.route('/expenses/bulk-delete', methods=['POST'])
+@jwt_required()
+def bulk_delete_expenses():
+    """Delete many expenses at once.
+
+    Expects `ids` (a list of expense ids) and/or `filter` (store,
+    store_contains, category, start_date, end_date, min_amount, max_amount).
+    Runs as a single DELETE scoped to the authenticated user.
+    """
+    try:
+        user_id = get_jwt_identity()
+        data = request.get_json() or {}
+        try:
+            condition = bulk_service.expense_condition(user_id, data.get('ids'), data.get('filter'))
+        except (ValueError, TypeError) as e:
+            return jsonify({'message': str(e)}), 400
+        
+        deleted = bulk_service.bulk_delete(db, user_id, condition)
+        db.session.commit()
+        
+        return jsonify({'deleted': deleted}), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': f'Failed to delete expenses: {str(e)}'}), 500
+
+@expenses_bp.route('/expenses/bulk-update', methods=['POST'])
+@jwt_required()
+def bulk_update_expenses():
+    """Recategorize many expenses at once.
+
+    Takes the same `ids` / `filter` selection as bulk-delete plus the new
+    `category`. Runs as a single UPDATE and records categorization feedback
+    for every changed expense.
+    """
+    try:
+        user_id = get_jwt_identity()
+        data = request.get_json() or {}
+        category = data.get('category')
+        if not category:
+            return jsonify({'message': 'category is required'}), 400
+        try:
+            condition = bulk_service.expense_condition(user_id, data.get('ids'), data.get('filter'))
+        except (ValueError, TypeError) as e:
+            return jsonify({'message': str(e)}), 400
+        
+        updated = bulk_service.bulk_recategorize(db, user_id, condition, category)
+        db.session.commit()
+        
+        return jsonify({'updated': updated}), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': f'Failed to update expenses: {str(e)}'}), 500
+
 @expenses_bp.route('/expenses/<int:expense_id>/feedback', methods=['POST'])
 @jwt_required()
 def submit_expense_feedback(expense_id: int):
@@ -125,9 +270,14 @@ def submit_expense_feedback(expense_id: int):
         )
 
         # Immediately update the stored category to reflect user intent
+        rollup_service.move_expense(db, expense, expense.category, corrected_category)
         expense.category = corrected_category
+        anomaly_service.rescore_expense(db, expense)
+        sync_service.record(db, expense)
 
         db.session.add(feedback)
+        PredictionService.evaluate_budget_alerts(user_id, db, rollup_service.month_start(expense.date))
+        bump_data_version(user_id, db)
         db.session.commit()
 
         return jsonify({'message': 'Feedback recorded successfully'}), 201
@@ -137,27 +287,42 @@ def submit_expense_feedback(expense_id: int):
 
 @expenses_bp.route('/predict', methods=['GET'])
 @jwt_required()
+@conditional_get
 def predict_spending():
     """Get AI prediction for next month's spending"""
     try:
         user_id = get_jwt_identity()
         
-        from app.services.prediction_service import PredictionService
-        prediction = PredictionService.predict_next_month_spending(user_id, db)
+        prediction = PredictionService.get_forecast(user_id, db)
         
         return jsonify(prediction), 200
         
     except Exception as e:
         return jsonify({'message': f'Prediction failed: {str(e)}'}), 500
 
+@expenses_bp.route('/predict/categories', methods=['GET'])
+@jwt_required()
+@conditional_get
+def predict_spending_by_category():
+    """Get next month's total and per-category forecast with prediction intervals"""
+    try:
+        user_id = get_jwt_identity()
+        
+        forecast = PredictionService.forecast_by_category(user_id, db)
+        
+        return jsonify(forecast), 200
+        
+    except Exception as e:
+        return jsonify({'message': f'Prediction failed: {str(e)}'}), 500
+
 @expenses_bp.route('/alerts', methods=['GET'])
 @jwt_required()
+@conditional_get
 def get_alerts():
     """Get budget alerts for user"""
     try:
         user_id = get_jwt_identity()
         
-        from app.services.prediction_service import PredictionService
         alerts = PredictionService.get_budget_alerts(user_id, db)
         
         return jsonify({'alerts': alerts}), 200
@@ -0,0 +1,124 @@
+import csv
+import io
+import zlib
+from datetime import date
+
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import select
+
+from app import db
+from app.fieldsets import FIELDS
+from app.models import Expense, Income, Subscription
+
+export_bp = Blueprint('export', __name__)
+
+# Rows fetched per round-trip from the server-side cursor
+BATCH_SIZE = 1000
+
+EXPORT_TYPES = {
+    'expenses': (Expense, 'expense', (Expense.date, Expense.id)),
+    'incomes': (Income, 'income', (Income.date, Income.id)),
+    'subscriptions': (Subscription, 'subscription', (Subscription.id,)),
+}
+CONTENT_TYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+
+def _columns(model):
+    return [name for name in FIELDS[model] if name != 'user_id']
+
+
+def _batches(user_id, name):
+    """Tuple rows of one export type, in batches from a streaming cursor."""
+    model, _, order = EXPORT_TYPES[name]
+    columns = _columns(model)
+    result = db.session.execute(
+        select(*(getattr(model, column) for column in columns))
+        .where(model.user_id == int(user_id))
+        .order_by(*order)
+        .execution_options(yield_per=BATCH_SIZE)
+    )
+    return columns, result.partitions()
+
+
+def _ndjson(user_id, names):
+    dumps = current_app.json.dumps
+    for name in names:
+        _, record_type, _ = EXPORT_TYPES[name]
+        columns, batches = _batches(user_id, name)
+        keys = ('type', *columns)
+        for batch in batches:
+            yield '\n'.join(dumps(dict(zip(keys, (record_type, *row))), sort_keys=False) for row in batch) + '\n'
+
+
+def _csv_value(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if isinstance(value, (list, dict)):  # items
+        return current_app.json.dumps(value)
+    return value
+
+
+def _csv(user_id, name):
+    columns, batches = _batches(user_id, name)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for batch in batches:
+        # Dates as ISO strings, items as JSON text
+        writer.writerows([_csv_value(value) for value in row] for row in batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _gzip(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+@export_bp.route('/export', methods=['GET'])
+@jwt_required()
+def export_ledger():
+    """Stream the user's expenses, incomes and subscriptions as NDJSON or CSV.
+
+    Query parameters: `format` (ndjson or csv, default ndjson), `type`
+    (expenses, incomes, subscriptions or all; CSV needs a single type,
+    default expenses) and `gzip=1` for a gzip-compressed download. Rows are
+    read in batches from a server-side cursor and written out as they
+    arrive, so memory does not depend on the size of the ledger.
+    """
+    try:
+        user_id = get_jwt_identity()
+        fmt = request.args.get('format', 'ndjson')
+        if fmt not in CONTENT_TYPES:
+            return jsonify({'message': 'format must be ndjson or csv'}), 400
+
+        kind = request.args.get('type', 'all' if fmt == 'ndjson' else 'expenses')
+        if kind == 'all' and fmt == 'ndjson':
+            names = list(EXPORT_TYPES)
+        elif kind in EXPORT_TYPES:
+            names = [kind]
+        else:
+            allowed = ', '.join(EXPORT_TYPES) + (', all' if fmt == 'ndjson' else '')
+            return jsonify({'message': f'type must be one of: {allowed}'}), 400
+
+        chunks = _ndjson(user_id, names) if fmt == 'ndjson' else _csv(user_id, names[0])
+        filename = f"{kind}-export-{date.today().isoformat()}.{fmt}"
+        mimetype = CONTENT_TYPES[fmt]
+        if request.args.get('gzip') in ('1', 'true'):
+            chunks = _gzip(chunks)
+            filename += '.gz'
+            mimetype = 'application/gzip'
+
+        response = Response(stream_with_context(chunks), mimetype=mimetype)
+        response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+    except Exception as e:
+        return jsonify({'message': f'Failed to export data: {str(e)}'}), 500
@@ -4,16 +4,32 @@ from datetime import datetime
 
 from app import db
 from app.models import Income
+from app.fieldsets import parse_fields, select_fields, serialize_rows
+from app.http_cache import conditional_get
+from app.pagination import keyset_page, page_args
+from app.services import rollup_service, sync_service
+from app.services.data_version import bump_data_version
 
 incomes_bp = Blueprint('incomes', __name__)
 
 
 @incomes_bp.route('/incomes', methods=['GET'])
 @jwt_required()
+@conditional_get
 def get_incomes():
-    """Get all incomes for authenticated user, optional month/year filters."""
+    """Get all incomes for authenticated user, optional month/year filters.
+
+    Passing `limit` and/or `cursor` returns one page, newest first, with a
+    `next_cursor` token for the following page. `fields=source,amount,...`
+    returns only those columns (plus `id`).
+    """
     try:
         user_id = get_jwt_identity()
+        try:
+            page = page_args(request.args)
+            fields = parse_fields(request.args, Income)
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
 
         query = Income.query.filter_by(user_id=user_id)
 
@@ -32,8 +48,15 @@ def get_incomes():
                     Income.date < datetime(year + 1, 1, 1),
                 )
 
+        # Tuple rows of the requested columns (all by default), no ORM objects
+        query = select_fields(query, Income, fields, extra=('date',))
+
+        if page is not None:
+            incomes, next_cursor = keyset_page(query, Income, *page)
+            return jsonify({'incomes': serialize_rows(incomes, Income, fields), 'next_cursor': next_cursor}), 200
+
         incomes = query.order_by(Income.date.desc()).all()
-        return jsonify({'incomes': [i.to_dict() for i in incomes]}), 200
+        return jsonify({'incomes': serialize_rows(incomes, Income, fields)}), 200
     except Exception as e:
         return jsonify({'message': f'Failed to fetch incomes: {str(e)}'}), 500
 
@@ -61,6 +84,9 @@ def create_income():
         )
 
         db.session.add(income)
+        rollup_service.record_income(db, income)
+        sync_service.record(db, income)
+        bump_data_version(user_id, db)
         db.session.commit()
 
         return jsonify(income.to_dict()), 201
@@ -80,7 +106,10 @@ def delete_income(income_id: int):
         if not income:
             return jsonify({'message': 'Income not found'}), 404
 
+        rollup_service.record_income(db, income, sign=-1)
+        sync_service.record(db, income, deleted=True)
         db.session.delete(income)
+        bump_data_version(user_id, db)
         db.session.commit()
 
         return jsonify({'message': 'Income deleted successfully'}), 200
@@ -4,6 +4,9 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 import os
 from app.services.simple_ocr_service import OCRService
 from app.services.simple_ml_service import ExpenseCategorizer
+from app.services import anomaly_service
+from app.services.merchant_index import get_user_merchant_index
+from app import db
 
 ocr_bp = Blueprint('ocr', __name__)
 
@@ -44,8 +47,8 @@ def upload_receipt():
         filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
         file.save(filepath)
         
-        # Process receipt with OCR
-        ocr_result = ocr_service.process_receipt(filepath)
+        # Process receipt with OCR, normalizing the store to the user's merchants
+        ocr_result = ocr_service.process_receipt(filepath, get_user_merchant_index(db, user_id))
         
         # Categorize expense using ML
         category_result = categorizer.categorize_expense(
@@ -69,6 +72,12 @@ def upload_receipt():
             'confidence': category_result['confidence']
         }
         
+        # Compare the amount with the user's history for the predicted category
+        if ocr_result['amount']:
+            response['anomaly'] = anomaly_service.preview(
+                db, user_id, category_result['predicted_category'], ocr_result['amount']
+            )
+        
         return jsonify(response), 200
         
     except Exception as e:
@@ -2,21 +2,31 @@ from flask import Blueprint, request, jsonify
 from app import db
 from app.models import Subscription
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.fieldsets import parse_fields, select_fields, serialize_rows
+from app.http_cache import conditional_get
+from app.services.data_version import bump_data_version
+from app.services import sync_service
 from datetime import datetime
 
 subscriptions_bp = Blueprint('subscriptions', __name__)
 
 @subscriptions_bp.route('/subscriptions', methods=['GET'])
 @jwt_required()
+@conditional_get
 def get_subscriptions():
-    """Get all subscriptions for authenticated user"""
+    """Get all subscriptions for authenticated user (`fields=` selects columns)"""
     try:
         user_id = get_jwt_identity()
+        try:
+            fields = parse_fields(request.args, Subscription)
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
         
-        subscriptions = Subscription.query.filter_by(user_id=user_id).all()
+        query = Subscription.query.filter_by(user_id=user_id)
+        rows = select_fields(query, Subscription, fields).all()
         
         return jsonify({
-            'subscriptions': [sub.to_dict() for sub in subscriptions]
+            'subscriptions': serialize_rows(rows, Subscription, fields)
         }), 200
         
     except Exception as e:
@@ -44,6 +54,8 @@ def create_subscription():
         )
         
         db.session.add(subscription)
+        sync_service.record(db, subscription)
+        bump_data_version(user_id, db)
         db.session.commit()
         
         return jsonify(subscription.to_dict()), 201
@@ -63,7 +75,9 @@ def delete_subscription(subscription_id):
         if not subscription:
             return jsonify({'message': 'Subscription not found'}), 404
         
+        sync_service.record(db, subscription, deleted=True)
         db.session.delete(subscription)
+        bump_data_version(user_id, db)
         db.session.commit()
         
         return jsonify({'message': 'Subscription deleted successfully'}), 200
@@ -0,0 +1,36 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+
+from app import db
+from app.services import sync_service
+
+sync_bp = Blueprint('sync', __name__)
+
+
+@sync_bp.route('/sync', methods=['GET'])
+@jwt_required()
+def sync():
+    """Changes to expenses, incomes, subscriptions and budgets since a cursor.
+
+    Without `since` the response holds every row (`full: true`). Otherwise it
+    holds, per collection, the current state of rows created or updated
+    after the cursor (`upserted`) and the ids of deleted rows (`deleted`).
+    Store the returned `cursor` and pass it as `since` next time; while
+    `has_more` is true, call again straight away.
+    """
+    try:
+        user_id = get_jwt_identity()
+        since = request.args.get('since')
+        if not since:
+            return jsonify(sync_service.full_snapshot(db, user_id)), 200
+
+        try:
+            since = int(since)
+            if since < 0:
+                raise ValueError
+        except ValueError:
+            return jsonify({'message': 'Invalid since cursor'}), 400
+
+        return jsonify(sync_service.changes_since(db, user_id, since)), 200
+    except Exception as e:
+        return jsonify({'message': f'Failed to sync: {str(e)}'}), 500
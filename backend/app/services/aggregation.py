@@ -0,0 +1,78 @@
+from datetime import date, datetime
+
+from sqlalchemy import Date, case, cast, func, literal, literal_column
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+
+def month_index(value):
+    """Months since year 0 for a date/datetime (month arithmetic helper)."""
+    return value.year * 12 + value.month - 1
+
+
+def month_from_index(index):
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_start(value):
+    """First day of the month containing a date/datetime."""
+    if isinstance(value, datetime):
+        value = value.date()
+    return date(value.year, value.month, 1)
+
+
+def add_months(value, months):
+    return month_from_index(month_index(value) + months)
+
+
+class month_bucket(FunctionElement):
+    """
+    First day of the month of a date column, as a DATE.
+
+    PostgreSQL gets `date_trunc('month', col)`, which its planner handles
+    natively. Other dialects (SQLite) get a range-based CASE over the month
+    boundaries between `start` and `end`: plain comparisons on the raw
+    column, monotone in the column, with no per-row date formatting.
+    Callers filter the column to the same range, which an index on
+    (user_id, date) serves directly.
+
+    Month boundaries are rendered inline so the expression compiles
+    identically in SELECT and GROUP BY.
+    """
+
+    type = Date()
+    inherit_cache = False
+    name = 'month_bucket'
+
+    def __init__(self, column, start, end):
+        self.column = column
+        self.start = month_start(start)
+        self.end = end.date() if isinstance(end, datetime) else end
+        super().__init__(column)
+
+
+@compiles(month_bucket)
+def _month_bucket_ranges(element, compiler, **kw):
+    first, last = month_index(element.start), month_index(element.end)
+    whens = []
+    for index in range(first, last + 1):
+        upper = month_from_index(index + 1)
+        whens.append((element.column < literal(upper, Date), literal(month_from_index(index), Date)))
+    if not whens:
+        return compiler.process(literal(None, Date), **kw)
+    expression = case(*whens, else_=literal(None, Date))
+    return compiler.process(expression, **{**kw, 'literal_binds': True})
+
+
+@compiles(month_bucket, 'postgresql')
+def _month_bucket_postgresql(element, compiler, **kw):
+    return compiler.process(cast(func.date_trunc(literal_column("'month'"), element.column), Date), **kw)
+
+
+def month_key(value):
+    """Normalize a bucket value (date, datetime or ISO string) to a 'YYYY-MM' key."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return value[:7]
+    return f'{value.year:04d}-{value.month:02d}'
@@ -0,0 +1,233 @@
+import json
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from sqlalchemy import insert
+
+from app.models import CategoryAmountStats, Expense, ExpenseAnomaly
+
+# Most recent amounts per (user, category) the median/MAD are computed over
+WINDOW = 90
+# Prior expenses a category needs before its amounts are scored
+MIN_HISTORY = 5
+# Robust z-score above which an expense is flagged (Iglewicz & Hoaglin)
+THRESHOLD = 3.5
+# MAD * 1.4826 estimates the standard deviation for normally distributed data
+MAD_TO_SIGMA = 1.4826
+# Lower bounds on the scale so near-constant categories (subscriptions)
+# do not flag a few cents of difference
+RELATIVE_FLOOR = 0.05
+ABSOLUTE_FLOOR = 1.0
+# Rows scored per block in the backfill; bounds the (rows x WINDOW) matrix
+BACKFILL_BLOCK = 20000
+
+
+def robust_score(amount, median, mad):
+    """Robust z-score of `amount` against a median/MAD; works on scalars and arrays."""
+    scale = np.maximum(np.maximum(MAD_TO_SIGMA * mad, RELATIVE_FLOOR * np.abs(median)), ABSOLUTE_FLOOR)
+    return (amount - median) / scale
+
+
+def _median_mad(values):
+    values = np.asarray(values, dtype=float)
+    median = float(np.median(values))
+    return median, float(np.median(np.abs(values - median)))
+
+
+def _result(score, median):
+    flagged = score is not None and score >= THRESHOLD
+    return {
+        'score': round(float(score), 2) if score is not None else None,
+        'median': round(median, 2) if median is not None else None,
+        'is_anomaly': bool(flagged),
+    }
+
+
+def _get_stats(db, user_id, category):
+    return CategoryAmountStats.query.filter_by(user_id=int(user_id), category=category).first()
+
+
+def _score_against(stats, amount):
+    if stats is None or len(json.loads(stats.window)) < MIN_HISTORY:
+        return None
+    return float(robust_score(amount, stats.median, stats.mad))
+
+
+def preview(db, user_id, category, amount):
+    """Score an amount against the category's history without recording it."""
+    stats = _get_stats(db, user_id, category)
+    score = _score_against(stats, amount)
+    return _result(score, stats.median if stats else None)
+
+
+def record_expense(db, expense):
+    """
+    Score a new expense against its category's window, store the score and
+    push the amount into the window, inside the caller's transaction.
+
+    Scoring reads the stored median/MAD, so it costs one row lookup however
+    long the history is; the window update is bounded by WINDOW.
+    """
+    if expense.id is None:
+        db.session.flush()
+
+    stats = _get_stats(db, expense.user_id, expense.category)
+    if stats is None:
+        stats = CategoryAmountStats(user_id=int(expense.user_id), category=expense.category, window='[]', count=0)
+        db.session.add(stats)
+
+    score = _score_against(stats, expense.amount)
+    result = _result(score, stats.median)
+    db.session.add(ExpenseAnomaly(
+        expense_id=expense.id,
+        user_id=int(expense.user_id),
+        category=expense.category,
+        score=score,
+        median=stats.median,
+        mad=stats.mad,
+        is_anomaly=result['is_anomaly'],
+    ))
+
+    window = (json.loads(stats.window) + [expense.amount])[-WINDOW:]
+    stats.window = json.dumps(window)
+    stats.median, stats.mad = _median_mad(window)
+    stats.count = (stats.count or 0) + 1
+    return result
+
+
+def rescore_expense(db, expense):
+    """Re-score an expense after its category changed (the windows are left as they are)."""
+    row = ExpenseAnomaly.query.filter_by(expense_id=expense.id).first()
+    if row is None:
+        return None
+    stats = _get_stats(db, expense.user_id, expense.category)
+    row.score = _score_against(stats, expense.amount)
+    row.category = expense.category
+    row.median = stats.median if stats else None
+    row.mad = stats.mad if stats else None
+    row.is_anomaly = row.score is not None and row.score >= THRESHOLD
+    return row
+
+
+def forget_expense(db, expense_id):
+    """Drop the stored score of a deleted expense."""
+    ExpenseAnomaly.query.filter_by(expense_id=expense_id).delete(synchronize_session=False)
+
+
+def month_anomalies(db, user_id, start, end):
+    """Flagged expenses dated in [start, end), newest first, with their scores."""
+    return (
+        db.session.query(
+            Expense.id, Expense.store, Expense.amount, Expense.date, Expense.category,
+            ExpenseAnomaly.score, ExpenseAnomaly.median,
+        )
+        .join(ExpenseAnomaly, ExpenseAnomaly.expense_id == Expense.id)
+        .filter(
+            ExpenseAnomaly.user_id == int(user_id),
+            ExpenseAnomaly.is_anomaly.is_(True),
+            Expense.date >= start,
+            Expense.date < end,
+        )
+        .order_by(Expense.date.desc())
+        .all()
+    )
+
+
+def score_history(frame):
+    """
+    Vectorized scores for a (user_id, category, date, id, amount) frame.
+
+    Each row is scored against the WINDOW amounts before it in its
+    (user, category), in date order, exactly as if the expenses had been
+    recorded one by one. Rows are processed in blocks: each block becomes a
+    (rows x WINDOW) matrix of prior amounts, with entries from other groups
+    masked out, and the median/MAD are taken along the rows.
+    Returns the frame sorted with `score`, `median` and `mad` columns.
+    """
+    frame = frame.sort_values(['user_id', 'category', 'date', 'id'], kind='stable').reset_index(drop=True)
+    amounts = frame['amount'].to_numpy(dtype=float)
+    groups = frame.groupby(['user_id', 'category'], sort=False).ngroup().to_numpy()
+    count = len(frame)
+
+    padded_amounts = np.concatenate([np.full(WINDOW, np.nan), amounts])
+    padded_groups = np.concatenate([np.full(WINDOW, -1), groups])
+    score = np.full(count, np.nan)
+    median = np.full(count, np.nan)
+    mad = np.full(count, np.nan)
+
+    for start in range(0, count, BACKFILL_BLOCK):
+        stop = min(start + BACKFILL_BLOCK, count)
+        # Row i of the block sees padded[i : i + WINDOW], i.e. the WINDOW rows before it
+        window = sliding_window_view(padded_amounts[start:stop + WINDOW - 1], WINDOW).copy()
+        window_groups = sliding_window_view(padded_groups[start:stop + WINDOW - 1], WINDOW)
+        window[window_groups != groups[start:stop, None]] = np.nan
+
+        enough = (~np.isnan(window)).sum(axis=1) >= MIN_HISTORY
+        if not enough.any():
+            continue
+        rows = np.flatnonzero(enough)
+        block_median = np.nanmedian(window[rows], axis=1)
+        block_mad = np.nanmedian(np.abs(window[rows] - block_median[:, None]), axis=1)
+        median[start + rows] = block_median
+        mad[start + rows] = block_mad
+        score[start + rows] = robust_score(amounts[start + rows], block_median, block_mad)
+
+    frame['score'] = score
+    frame['median'] = median
+    frame['mad'] = mad
+    return frame
+
+
+def backfill(db, user_id=None):
+    """
+    Recompute stored scores and per-category windows from the full history.
+    The caller commits. Returns the number of expenses scored.
+    """
+    query = db.session.query(Expense.id, Expense.user_id, Expense.category, Expense.date, Expense.amount)
+    anomalies, stats = ExpenseAnomaly.query, CategoryAmountStats.query
+    if user_id is not None:
+        query = query.filter(Expense.user_id == user_id)
+        anomalies = anomalies.filter_by(user_id=user_id)
+        stats = stats.filter_by(user_id=user_id)
+    anomalies.delete(synchronize_session=False)
+    stats.delete(synchronize_session=False)
+
+    frame = pd.DataFrame(query.all(), columns=['id', 'user_id', 'category', 'date', 'amount'])
+    if frame.empty:
+        return 0
+    frame = score_history(frame)
+
+    def optional(values):
+        return [None if np.isnan(v) else float(v) for v in values]
+
+    db.session.execute(insert(ExpenseAnomaly), [
+        {
+            'expense_id': int(expense_id),
+            'user_id': int(uid),
+            'category': category,
+            'score': score,
+            'median': median,
+            'mad': mad,
+            'is_anomaly': score is not None and score >= THRESHOLD,
+        }
+        for expense_id, uid, category, score, median, mad in zip(
+            frame['id'], frame['user_id'], frame['category'],
+            optional(frame['score']), optional(frame['median']), optional(frame['mad']),
+        )
+    ])
+
+    rows = []
+    for (uid, category), group in frame.groupby(['user_id', 'category'], sort=False):
+        window = group['amount'].to_numpy(dtype=float)[-WINDOW:]
+        median, mad = _median_mad(window)
+        rows.append({
+            'user_id': int(uid),
+            'category': category,
+            'window': json.dumps(window.tolist()),
+            'median': median,
+            'mad': mad,
+            'count': len(group),
+        })
+    db.session.execute(insert(CategoryAmountStats), rows)
+    return len(frame)
@@ -0,0 +1,150 @@
+import json
+import time
+from datetime import datetime
+
+from sqlalchemy import select, update, exists
+
+from app.models import Expense, CategorizationFeedback, BackfillCheckpoint
+from app.services.simple_ml_service import ExpenseCategorizer
+from app.services.prediction_service import PredictionService
+from app.services.data_version import bump_data_version
+from app.services import rollup_service, sync_service
+
+
+def expense_description(store, items):
+    """Build the categorizer input text from a store name and stored items JSON."""
+    parts = [store or '']
+    if items:
+        try:
+            parsed = json.loads(items) if isinstance(items, str) else items
+        except ValueError:
+            parsed = None
+        for item in parsed or []:
+            name = item.get('name') if isinstance(item, dict) else item
+            if name:
+                parts.append(str(name))
+    return ' '.join(parts).strip()
+
+
+class RecategorizationBackfill:
+    """
+    Resumable job that re-runs the categorizer over stored expenses.
+
+    Expenses are walked in primary-key order in fixed-size chunks. Each chunk
+    is categorized in one batch, changed rows are written with a single
+    executemany UPDATE, and the checkpoint cursor is advanced in the same
+    transaction, so an interrupted run resumes from the last committed chunk.
+    Rows the user corrected through categorization feedback are never touched.
+    Month totals move with the changed rows in the same transaction.
+    """
+
+    def __init__(self, db, user_id=None, chunk_size=5000, categorizer=None,
+                 min_confidence=0.0, progress=None):
+        self.db = db
+        self.user_id = user_id
+        self.chunk_size = chunk_size
+        self.categorizer = categorizer or ExpenseCategorizer()
+        self.min_confidence = min_confidence
+        self.progress = progress
+        self._cache = {}
+
+    @property
+    def job_name(self):
+        scope = self.user_id if self.user_id is not None else 'all'
+        return f'recategorize:{scope}'
+
+    def _load_checkpoint(self, reset=False):
+        checkpoint = BackfillCheckpoint.query.filter_by(job_name=self.job_name).first()
+        if not checkpoint:
+            checkpoint = BackfillCheckpoint(job_name=self.job_name, last_expense_id=0, processed=0, updated=0)
+            self.db.session.add(checkpoint)
+        elif reset or checkpoint.completed_at is not None:
+            checkpoint.last_expense_id = 0
+            checkpoint.processed = 0
+            checkpoint.updated = 0
+            checkpoint.completed_at = None
+        self.db.session.commit()
+        return checkpoint
+
+    def _fetch_chunk(self, after_id):
+        corrected = exists().where(CategorizationFeedback.expense_id == Expense.id)
+        stmt = (
+            select(Expense.id, Expense.store, Expense.items, Expense.category,
+                   Expense.user_id, Expense.date, Expense.amount)
+            .where(Expense.id > after_id, ~corrected)
+            .order_by(Expense.id)
+            .limit(self.chunk_size)
+        )
+        if self.user_id is not None:
+            stmt = stmt.where(Expense.user_id == self.user_id)
+        return self.db.session.execute(stmt).all()
+
+    def _categorize(self, description):
+        # Store names repeat heavily across a ledger, so memoize per run
+        cached = self._cache.get(description)
+        if cached is None:
+            result = self.categorizer.categorize_expense(description)
+            cached = (result['category'], result['confidence'])
+            self._cache[description] = cached
+        return cached
+
+    def _changes_for(self, rows):
+        changes, moves, synced = [], [], []
+        for expense_id, store, items, current, user_id, day, amount in rows:
+            category, confidence = self._categorize(expense_description(store, items))
+            # 'Other' means no rule matched; keep whatever label the row already has
+            if category == 'Other' or confidence < self.min_confidence:
+                continue
+            if category != current:
+                changes.append({'id': expense_id, 'category': category})
+                synced.append((user_id, 'expenses', expense_id))
+                moves.append((user_id, day, current, amount, -1))
+                moves.append((user_id, day, category, amount, 1))
+        return changes, moves, synced
+
+    def _apply_moves(self, moves):
+        current_month = rollup_service.month_start(datetime.now())
+        for user_id, deltas in rollup_service.expense_deltas(moves).items():
+            rollup_service.apply_deltas(self.db, user_id, deltas)
+            if any(month == current_month for month, _ in deltas):
+                PredictionService.evaluate_budget_alerts(user_id, self.db, current_month)
+            bump_data_version(user_id, self.db)
+
+    def run(self, reset=False, max_chunks=None):
+        """Run (or resume) the backfill and return the final checkpoint as a dict."""
+        checkpoint = self._load_checkpoint(reset=reset)
+        started = time.perf_counter()
+        run_processed = 0
+        chunks = 0
+
+        while max_chunks is None or chunks < max_chunks:
+            rows = self._fetch_chunk(checkpoint.last_expense_id)
+            if not rows:
+                checkpoint.completed_at = datetime.utcnow()
+                self.db.session.commit()
+                break
+
+            changes, moves, synced = self._changes_for(rows)
+            if changes:
+                self.db.session.execute(update(Expense), changes)
+                sync_service.record_ids(self.db, synced)
+                self._apply_moves(moves)
+
+            checkpoint.last_expense_id = rows[-1][0]
+            checkpoint.processed += len(rows)
+            checkpoint.updated += len(changes)
+            self.db.session.commit()
+
+            chunks += 1
+            run_processed += len(rows)
+            if self.progress:
+                elapsed = time.perf_counter() - started
+                self.progress({
+                    'job': self.job_name,
+                    'last_expense_id': checkpoint.last_expense_id,
+                    'processed': checkpoint.processed,
+                    'updated': checkpoint.updated,
+                    'rows_per_second': round(run_processed / elapsed, 1) if elapsed > 0 else None,
+                })
+
+        return checkpoint.to_dict()
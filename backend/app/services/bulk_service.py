@@ -0,0 +1,162 @@
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import and_, delete, func, insert, literal, select, update
+
+from app.models import CategorizationFeedback, Expense, ExpenseAnomaly
+from app.services import rollup_service, sync_service
+from app.services.data_version import bump_data_version
+from app.services.prediction_service import PredictionService
+
+# Upper bound on explicit id lists per request
+MAX_IDS = 5000
+
+TEXT_FILTERS = ('store', 'store_contains', 'category', 'start_date', 'end_date')
+AMOUNT_FILTERS = ('min_amount', 'max_amount')
+FILTER_KEYS = TEXT_FILTERS + AMOUNT_FILTERS
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _check_filters(filters):
+    """Reject filter values of the wrong JSON type before they reach the query."""
+    if not isinstance(filters, dict):
+        raise ValueError('filter must be an object')
+    unknown = set(filters) - set(FILTER_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown filter(s): {', '.join(sorted(unknown))}")
+    for key, value in filters.items():
+        if value is None:
+            continue
+        if key in TEXT_FILTERS and not isinstance(value, str):
+            raise ValueError(f'{key} must be a string')
+        if key in AMOUNT_FILTERS and not (_is_number(value) or isinstance(value, str)):
+            raise ValueError(f'{key} must be a number')
+
+
+def expense_condition(user_id, ids=None, filters=None):
+    """
+    WHERE clause for the user's expenses selected by an id list and/or
+    filter predicates. Raises ValueError when neither narrows the selection,
+    so a malformed request can never touch the whole ledger.
+    """
+    clauses = []
+    if ids:
+        if (
+            not isinstance(ids, list)
+            or len(ids) > MAX_IDS
+            or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids)
+        ):
+            raise ValueError(f'ids must be a list of at most {MAX_IDS} expense ids')
+        clauses.append(Expense.id.in_(ids))
+
+    if filters is None:
+        filters = {}
+    _check_filters(filters)
+    if filters.get('store'):
+        clauses.append(func.lower(Expense.store) == filters['store'].strip().lower())
+    if filters.get('store_contains'):
+        clauses.append(func.lower(Expense.store).contains(filters['store_contains'].strip().lower(), autoescape=True))
+    if filters.get('category'):
+        clauses.append(Expense.category == filters['category'])
+    if filters.get('start_date'):
+        clauses.append(Expense.date >= datetime.fromisoformat(filters['start_date']).date())
+    if filters.get('end_date'):
+        clauses.append(Expense.date <= datetime.fromisoformat(filters['end_date']).date())
+    if filters.get('min_amount') is not None:
+        clauses.append(Expense.amount >= float(filters['min_amount']))
+    if filters.get('max_amount') is not None:
+        clauses.append(Expense.amount <= float(filters['max_amount']))
+
+    if not clauses:
+        raise ValueError('Provide ids or at least one filter')
+    return and_(Expense.user_id == int(user_id), *clauses)
+
+
+def _grouped_amounts(db, condition):
+    """(date, category, total, count) of the selected rows, for rollup deltas."""
+    return db.session.execute(
+        select(Expense.date, Expense.category, func.sum(Expense.amount), func.count(Expense.id))
+        .where(condition)
+        .group_by(Expense.date, Expense.category)
+    ).all()
+
+
+def _add_groups(deltas, groups, sign, category=None):
+    """Fold grouped (date, category, total, count) rows into month deltas."""
+    for day, group_category, total, count in groups:
+        entry = deltas[(rollup_service.month_start(day), category or group_category)]
+        entry[0] += sign * total
+        entry[1] += sign * count
+
+
+def _apply(db, user_id, deltas):
+    rollup_service.apply_deltas(db, user_id, deltas)
+    current_month = rollup_service.month_start(datetime.now())
+    if any(month == current_month for month, _ in deltas):
+        PredictionService.evaluate_budget_alerts(user_id, db, current_month)
+    bump_data_version(user_id, db)
+
+
+def bulk_delete(db, user_id, condition):
+    """Delete the selected expenses with one DELETE; the caller commits. Returns the row count."""
+    groups = _grouped_amounts(db, condition)
+    if not groups:
+        return 0
+
+    deltas = defaultdict(lambda: [0.0, 0])
+    _add_groups(deltas, groups, -1)
+
+    sync_service.record_selected(db, user_id, Expense, condition, deleted=True)
+    # Rows referencing the expenses go first (categorization_feedback has a
+    # plain foreign key, and bulk_recategorize writes feedback for every row)
+    selected = select(Expense.id).where(condition)
+    for model in (ExpenseAnomaly, CategorizationFeedback):
+        db.session.execute(
+            delete(model)
+            .where(model.expense_id.in_(selected))
+            .execution_options(synchronize_session=False)
+        )
+    deleted = db.session.execute(
+        delete(Expense).where(condition).execution_options(synchronize_session=False)
+    ).rowcount
+    _apply(db, user_id, deltas)
+    return deleted
+
+
+def bulk_recategorize(db, user_id, condition, category):
+    """
+    Move the selected expenses to `category` with one UPDATE, recording a
+    CategorizationFeedback row per changed expense with INSERT ... SELECT.
+    The caller commits. Returns the number of expenses changed.
+    """
+    changing = and_(condition, Expense.category != category)
+    groups = _grouped_amounts(db, changing)
+    if not groups:
+        return 0
+
+    deltas = defaultdict(lambda: [0.0, 0])
+    _add_groups(deltas, groups, -1)
+    _add_groups(deltas, groups, 1, category)
+
+    db.session.execute(
+        insert(CategorizationFeedback).from_select(
+            ['user_id', 'expense_id', 'original_category', 'corrected_category', 'created_at'],
+            select(Expense.user_id, Expense.id, Expense.category, literal(category), literal(datetime.utcnow()))
+            .where(changing),
+        )
+    )
+    sync_service.record_selected(db, user_id, Expense, changing)
+    db.session.execute(
+        update(ExpenseAnomaly)
+        .where(ExpenseAnomaly.expense_id.in_(select(Expense.id).where(changing)))
+        .values(category=category)
+        .execution_options(synchronize_session=False)
+    )
+    changed = db.session.execute(
+        update(Expense).where(changing).values(category=category).execution_options(synchronize_session=False)
+    ).rowcount
+    _apply(db, user_id, deltas)
+    return changed
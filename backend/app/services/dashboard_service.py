@@ -0,0 +1,79 @@
+from sqlalchemy import String, and_, literal, or_, select, union_all
+
+from app.models import Budget, CategoryBudget, MonthlyRollup
+from app.services.aggregation import add_months
+from app.services.rollup_service import EXPENSE, INCOME
+
+
+def month_summary(db, user_id, month, trend_months=6):
+    """
+    Totals, expense breakdown and expense trend for one user-month in a
+    single statement over the monthly rollups.
+
+    Returns {'expenses', 'income', 'by_category', 'trend'} where `trend` is
+    [(month, total)] for months with expenses from `trend_months` back up to
+    and including `month`.
+    """
+    first_month = add_months(month, -trend_months)
+    rows = db.session.execute(
+        select(MonthlyRollup.month, MonthlyRollup.kind, MonthlyRollup.category, MonthlyRollup.total)
+        .where(
+            MonthlyRollup.user_id == int(user_id),
+            MonthlyRollup.month >= first_month,
+            MonthlyRollup.month <= month,
+            MonthlyRollup.count > 0,
+            or_(
+                MonthlyRollup.kind == EXPENSE,
+                and_(MonthlyRollup.kind == INCOME, MonthlyRollup.month == month),
+            ),
+        )
+        .order_by(MonthlyRollup.month)
+    )
+
+    by_category, trend = {}, {}
+    income = 0.0
+    for bucket, kind, category, total in rows:
+        if kind == INCOME:
+            income += total
+            continue
+        trend[bucket] = trend.get(bucket, 0.0) + total
+        if bucket == month:
+            by_category[category] = total
+
+    return {
+        'expenses': sum(by_category.values()),
+        'income': income,
+        'by_category': by_category,
+        'trend': list(trend.items()),
+    }
+
+
+def budget_summary(db, user_id):
+    """
+    The overall budget and per-category budgets of a user in one statement.
+
+    Returns (budget, category_budgets): `budget` is a dict with
+    `monthly_limit` and `currency` or None, `category_budgets` a list of
+    {'category', 'monthly_limit'} dicts.
+    """
+    user_id = int(user_id)
+    overall = select(
+        literal(0).label('id'),
+        literal(None, String).label('category'),
+        Budget.monthly_limit,
+        Budget.currency,
+    ).where(Budget.user_id == user_id)
+    per_category = select(
+        CategoryBudget.id,
+        CategoryBudget.category,
+        CategoryBudget.monthly_limit,
+        literal(None, String),
+    ).where(CategoryBudget.user_id == user_id)
+
+    budget, category_budgets = None, []
+    for row in db.session.execute(union_all(overall, per_category).order_by('id')):
+        if row.category is None:
+            budget = {'monthly_limit': row.monthly_limit, 'currency': row.currency}
+        else:
+            category_budgets.append({'category': row.category, 'monthly_limit': row.monthly_limit})
+    return budget, category_budgets
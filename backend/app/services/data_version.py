@@ -0,0 +1,95 @@
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from app.models import UserDataVersion
+
+
+def get_data_version(user_id, db):
+    """Current data version for a user (0 until their first tracked write)."""
+    version = (
+        db.session.query(UserDataVersion.version)
+        .filter(UserDataVersion.user_id == int(user_id))
+        .scalar()
+    )
+    return version or 0
+
+
+def get_data_version_state(user_id, db):
+    """(version, updated_at) for a user; (0, None) before their first tracked write."""
+    row = (
+        db.session.query(UserDataVersion.version, UserDataVersion.updated_at)
+        .filter(UserDataVersion.user_id == int(user_id))
+        .first()
+    )
+    return (row.version, row.updated_at) if row else (0, None)
+
+
+def bump_data_version(user_id, db):
+    """
+    Increment the user's data version inside the caller's transaction.
+
+    Call this from every write that changes what derived data (forecasts,
+    cached responses) would return; the caller commits.
+    """
+    user_id = int(user_id)
+    updated = (
+        UserDataVersion.query.filter_by(user_id=user_id)
+        .update(
+            {
+                UserDataVersion.version: UserDataVersion.version + 1,
+                UserDataVersion.updated_at: datetime.utcnow(),
+            },
+            synchronize_session=False,
+        )
+    )
+    if not updated:
+        db.session.add(UserDataVersion(user_id=user_id, version=1, updated_at=datetime.utcnow()))
+
+
+class VersionedCache:
+    """
+    Small thread-safe LRU cache whose entries are only valid for the data
+    version they were computed at. A lookup with a newer version misses, so
+    bumping the user's version invalidates everything derived from it.
+
+    With `maxbytes`, values must support len() and the least recently used
+    entries are also evicted once their lengths add up to more than it.
+    """
+
+    def __init__(self, maxsize=1024, maxbytes=None):
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _size(self, value):
+        return len(value) if self.maxbytes is not None else 0
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, version, value):
+        with self._lock:
+            previous = self._entries.get(key)
+            if previous is not None:
+                self._bytes -= self._size(previous[1])
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            self._bytes += self._size(value)
+            while len(self._entries) > self.maxsize or (
+                self.maxbytes is not None and self._bytes > self.maxbytes
+            ):
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= self._size(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
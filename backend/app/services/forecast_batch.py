@@ -0,0 +1,133 @@
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, insert, update
+
+from app.models import User, Expense, SpendingForecast, UserDataVersion
+from app.services.aggregation import add_months, month_bucket
+
+
+class ForecastBatchJob:
+    """
+    Precompute next month's spending forecast for every user at once.
+
+    Monthly totals for all users come from a single grouped query and are
+    pivoted into a (user x month) matrix; the weighted-average-plus-trend
+    model of `PredictionService.predict_next_month_spending` is then applied
+    to every row with array operations. Each stored forecast is stamped with
+    the user's data version read *before* the totals, so any write that
+    lands during or after the batch makes the row stale and the endpoints
+    fall back to computing on demand.
+    """
+
+    def __init__(self, db, lookback_days=180):
+        self.db = db
+        self.lookback_days = lookback_days
+
+    def _load_versions(self):
+        rows = self.db.session.query(User.id, func.coalesce(UserDataVersion.version, 0)).outerjoin(
+            UserDataVersion, UserDataVersion.user_id == User.id
+        )
+        return pd.Series(dict(rows.all()), dtype='int64')
+
+    def _load_monthly_totals(self):
+        now = datetime.now()
+        since = now - timedelta(days=self.lookback_days)
+        month = month_bucket(Expense.date, since, now).label('month')
+        rows = (
+            self.db.session.query(Expense.user_id, month, func.sum(Expense.amount))
+            .filter(Expense.date >= since, Expense.date < add_months(now, 1))
+            .group_by(Expense.user_id, month)
+            .all()
+        )
+        return pd.DataFrame(rows, columns=['user_id', 'month', 'total'])
+
+    @staticmethod
+    def compute(totals, user_ids):
+        """
+        Vectorized forecast for each user from a long (user_id, month, total)
+        frame. Returns a frame indexed by user_id with the same fields as the
+        on-demand prediction.
+        """
+        matrix = totals.pivot(index='user_id', columns='month', values='total')
+        matrix = matrix.reindex(index=user_ids).sort_index(axis=1)
+        values = matrix.to_numpy(dtype=float)
+        if values.shape[1] == 0:
+            values = np.full((len(user_ids), 1), np.nan)
+        valid = ~np.isnan(values)
+        months = valid.sum(axis=1)
+
+        # Pack each row's observed months to the right, keeping their order,
+        # so the last n columns hold the user's n monthly totals
+        order = np.argsort(valid, axis=1, kind='stable')
+        packed = np.take_along_axis(np.nan_to_num(values), order, axis=1)
+        width = packed.shape[1]
+        position = np.arange(width)
+        observed = position >= (width - months)[:, None]
+
+        safe_months = np.maximum(months, 1)
+        mean = (packed * observed).sum(axis=1) / safe_months
+
+        # Weighted average of the last 3 months when at least 3 exist
+        last3 = packed[:, -3:]
+        if last3.shape[1] < 3:
+            last3 = np.pad(last3, ((0, 0), (3 - last3.shape[1], 0)))
+        weights = np.array([1.0, 2.0, 3.0]) / 6.0
+        weighted = last3 @ weights
+        predicted = np.where(months >= 3, weighted, mean)
+
+        # Trend: (last - first) / n when at least 2 months exist
+        first = packed[np.arange(len(packed)), np.minimum(width - months, width - 1)]
+        last = packed[:, -1]
+        trend = np.where(months >= 2, (last - first) / safe_months, 0.0)
+        predicted = np.where(months > 0, predicted + trend, 0.0)
+
+        return pd.DataFrame(
+            {
+                'predicted_amount': np.round(predicted, 2),
+                'confidence': np.round(np.minimum(months / 6.0, 1.0), 2),
+                'based_on_months': months.astype(int),
+                'historical_average': np.where(months > 0, np.round(mean, 2), np.nan),
+            },
+            index=pd.Index(user_ids, name='user_id'),
+        )
+
+    def _store(self, forecasts, versions):
+        now = datetime.utcnow()
+        existing = dict(self.db.session.query(SpendingForecast.user_id, SpendingForecast.id).all())
+
+        updates, inserts = [], []
+        for row in forecasts.itertuples():
+            user_id = row.Index
+            values = {
+                'predicted_amount': float(row.predicted_amount),
+                'confidence': float(row.confidence),
+                'based_on_months': int(row.based_on_months),
+                'historical_average': None if pd.isna(row.historical_average) else float(row.historical_average),
+                'data_version': int(versions[user_id]),
+                'computed_at': now,
+            }
+            if user_id in existing:
+                updates.append({'id': existing[user_id], **values})
+            else:
+                inserts.append({'user_id': int(user_id), **values})
+
+        if updates:
+            self.db.session.execute(update(SpendingForecast), updates)
+        if inserts:
+            self.db.session.execute(insert(SpendingForecast), inserts)
+        self.db.session.commit()
+
+    def run(self):
+        """Compute and store forecasts for all users; returns run statistics."""
+        started = time.perf_counter()
+        versions = self._load_versions()
+        totals = self._load_monthly_totals()
+        forecasts = self.compute(totals, list(versions.index))
+        self._store(forecasts, versions)
+        return {
+            'users': len(forecasts),
+            'seconds': round(time.perf_counter() - started, 3),
+        }
@@ -0,0 +1,110 @@
+import numpy as np
+
+# z-score for the two-sided prediction interval reported with each forecast
+_INTERVAL_Z = {0.8: 1.2816, 0.9: 1.6449, 0.95: 1.96}
+
+
+class CategoryForecaster:
+    """
+    Exponential smoothing fitted to every category of a user at once.
+
+    Input is a (category x month) matrix of spend. Holt's linear method is
+    run for a small grid of smoothing parameters simultaneously: the state
+    arrays have shape (grid, categories), so each month is one set of NumPy
+    operations and the cost grows with the number of months only. Each
+    category keeps the parameters with the lowest one-step squared error.
+    With at least two full seasons of history, additive Holt-Winters with a
+    12-month season is used instead.
+    """
+
+    def __init__(self, alphas=(0.2, 0.4, 0.6, 0.8), betas=(0.05, 0.2, 0.4),
+                 gammas=(0.1, 0.3), season_length=12, interval=0.8):
+        self.season_length = season_length
+        self.z = _INTERVAL_Z.get(interval, 1.2816)
+        self.interval = interval
+        grid = np.array([(a, b, g) for a in alphas for b in betas for g in gammas], dtype=float)
+        self._alpha = grid[:, 0][:, None]
+        self._beta = grid[:, 1][:, None]
+        self._gamma = grid[:, 2][:, None]
+
+    def _holt(self, y):
+        grid = self._alpha.shape[0]
+        level = np.repeat(y[None, :, 0], grid, axis=0)
+        trend = np.repeat(y[None, :, 1] - y[None, :, 0], grid, axis=0)
+        sse = np.zeros_like(level)
+        for t in range(1, y.shape[1]):
+            observed = y[None, :, t]
+            error = observed - (level + trend)
+            sse += error ** 2
+            new_level = self._alpha * observed + (1 - self._alpha) * (level + trend)
+            trend = self._beta * (new_level - level) + (1 - self._beta) * trend
+            level = new_level
+        return level, trend, None, sse, y.shape[1] - 1
+
+    def _holt_winters(self, y):
+        m = self.season_length
+        grid = self._alpha.shape[0]
+        first, second = y[:, :m].mean(axis=1), y[:, m:2 * m].mean(axis=1)
+        level = np.repeat(first[None, :], grid, axis=0)
+        trend = np.repeat(((second - first) / m)[None, :], grid, axis=0)
+        # Ring buffer of the last m seasonal components, indexed by t % m
+        seasonal = np.repeat((y[:, :m] - first[:, None])[None, :, :], grid, axis=0)
+        sse = np.zeros_like(level)
+        for t in range(m, y.shape[1]):
+            observed = y[None, :, t]
+            season = seasonal[:, :, t % m]
+            error = observed - (level + trend + season)
+            sse += error ** 2
+            new_level = self._alpha * (observed - season) + (1 - self._alpha) * (level + trend)
+            trend = self._beta * (new_level - level) + (1 - self._beta) * trend
+            seasonal[:, :, t % m] = self._gamma * (observed - new_level) + (1 - self._gamma) * season
+            level = new_level
+        return level, trend, seasonal, sse, y.shape[1] - m
+
+    def forecast(self, matrix, horizon=1):
+        """
+        Forecast `horizon` months past the last column of `matrix`.
+
+        Returns a dict of per-category arrays (`point`, `lower`, `upper`), the
+        method used and the number of months the fit was based on.
+        """
+        y = np.asarray(matrix, dtype=float)
+        categories, months = y.shape
+        if categories == 0 or months == 0:
+            empty = np.zeros(categories)
+            return {'point': empty, 'lower': empty, 'upper': empty, 'variance': empty,
+                    'method': 'none', 'months': months}
+
+        if months == 1:
+            point = y[:, 0]
+            return {'point': point, 'lower': point, 'upper': point, 'variance': np.zeros(categories),
+                    'method': 'naive', 'months': 1}
+
+        seasonal_fit = months >= 2 * self.season_length
+        level, trend, seasonal, sse, fitted = (
+            self._holt_winters(y) if seasonal_fit else self._holt(y)
+        )
+
+        best = np.argmin(sse, axis=0)
+        cols = np.arange(categories)
+        level, trend = level[best, cols], trend[best, cols]
+        alpha, beta = self._alpha[best, 0], self._beta[best, 0]
+        point = level + horizon * trend
+        if seasonal_fit:
+            point = point + seasonal[best, cols, (months + horizon - 1) % self.season_length]
+
+        # ETS(A,A,N) h-step variance: sigma^2 * (1 + sum_j (alpha + j*alpha*beta)^2)
+        sigma2 = sse[best, cols] / max(fitted, 1)
+        steps = np.arange(1, horizon)[:, None]
+        spread = (1 + ((alpha[None, :] * (1 + steps * beta[None, :])) ** 2).sum(axis=0)) if horizon > 1 else 1.0
+        half_width = self.z * np.sqrt(sigma2 * spread)
+
+        point = np.maximum(point, 0.0)
+        return {
+            'point': point,
+            'lower': np.maximum(point - half_width, 0.0),
+            'upper': point + half_width,
+            'variance': sigma2 * spread,
+            'method': 'holt_winters' if seasonal_fit else 'holt',
+            'months': months,
+        }
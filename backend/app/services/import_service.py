@@ -0,0 +1,293 @@
+import csv
+import io
+import re
+from collections import Counter
+from datetime import datetime
+from functools import lru_cache
+
+from sqlalchemy import insert, select
+
+from app.models import Expense
+from app.services import anomaly_service, rollup_service, sync_service
+from app.services.data_version import bump_data_version
+from app.services.merchant_index import get_user_merchant_index, normalize_store
+from app.services.prediction_service import PredictionService
+from app.services.simple_ml_service import ExpenseCategorizer
+
+# Header aliases for CSV exports of common banks
+_CSV_COLUMNS = {
+    'date': ('date', 'transaction date', 'posted date', 'posting date', 'booking date'),
+    'amount': ('amount', 'transaction amount', 'value'),
+    'debit': ('debit', 'withdrawal', 'money out'),
+    'credit': ('credit', 'deposit', 'money in'),
+    'store': ('store', 'merchant', 'payee', 'description', 'name', 'details'),
+    'category': ('category',),
+}
+_DATE_FORMATS = ('%Y-%m-%d', '%m/%d/%Y', '%d.%m.%Y', '%Y/%m/%d', '%d/%m/%Y', '%Y%m%d')
+_OFX_TAG = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<]*)')
+_OFX_CHUNK = 64 * 1024
+
+# Errors reported back to the client; the total is always returned
+MAX_REPORTED_ERRORS = 100
+
+# Sign of spending in a signed amount column: 'negative' for bank
+# statements (money out is negative; OFX always), 'positive' for card
+# exports that list purchases as positive amounts. The other side is
+# money coming in and is skipped.
+SIGN_CONVENTIONS = ('negative', 'positive')
+
+
+class SkipRow(Exception):
+    """A valid row that is not an expense (e.g. a credit)."""
+
+
+def parse_csv(stream):
+    """Yield (row_number, {date, amount, store, category}) from a CSV upload, one row at a time."""
+    reader = csv.reader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+    header = next(reader, None)
+    if header is None:
+        return
+    normalized = [name.strip().lower() for name in header]
+    positions = {}
+    for field, aliases in _CSV_COLUMNS.items():
+        for alias in aliases:
+            if alias in normalized:
+                positions[field] = normalized.index(alias)
+                break
+
+    for row_number, row in enumerate(reader, start=2):
+        if not any(cell.strip() for cell in row):
+            continue
+        yield row_number, {
+            field: row[index].strip() if index < len(row) else ''
+            for field, index in positions.items()
+        }
+
+
+def parse_ofx(stream):
+    """Yield (transaction_number, fields) for each <STMTTRN> block of an OFX statement."""
+    text = io.TextIOWrapper(stream, encoding='utf-8', errors='replace')
+    buffer, current, number = '', None, 0
+    while True:
+        chunk = text.read(_OFX_CHUNK)
+        buffer += chunk
+        # Only consume up to the last complete tag; the rest waits for more input
+        cut = len(buffer) if not chunk else max(buffer.rfind('<'), 0)
+        for closing, tag, value in _OFX_TAG.findall(buffer[:cut]):
+            tag = tag.upper()
+            if tag == 'STMTTRN':
+                if closing and current is not None:
+                    number += 1
+                    yield number, _ofx_fields(current)
+                    current = None
+                elif not closing:
+                    current = {}
+            elif current is not None and not closing:
+                current[tag] = value.strip()
+        buffer = buffer[cut:]
+        if not chunk:
+            break
+
+
+def _ofx_fields(transaction):
+    # TRNAMT is signed (negative: money out), whatever TRNTYPE says
+    return {
+        'date': transaction.get('DTPOSTED', '')[:8],
+        'amount': transaction.get('TRNAMT', ''),
+        'store': transaction.get('NAME') or transaction.get('MEMO', ''),
+    }
+
+
+@lru_cache(maxsize=4096)  # statements repeat the same dates many times
+def _parse_date(value):
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"unrecognized date '{value}'")
+
+
+def _parse_amount(value):
+    cleaned = value.replace(',', '').replace('$', '').replace(' ', '')
+    if cleaned.startswith('(') and cleaned.endswith(')'):
+        cleaned = '-' + cleaned[1:-1]
+    return float(cleaned)
+
+
+def _amount(raw_amount):
+    try:
+        return round(_parse_amount(raw_amount), 2)
+    except ValueError:
+        raise ValueError(f"invalid amount '{raw_amount}'")
+
+
+def validate(fields, sign='negative'):
+    """
+    Normalize a parsed row to (date, amount, store, category or None).
+    A signed `amount` is read with the `sign` convention and rows on the
+    income side raise SkipRow; a separate debit column is always spending.
+    """
+    if fields.get('skip'):
+        raise SkipRow(fields['skip'])
+
+    if fields.get('amount'):
+        amount = _amount(fields['amount'])
+        if sign == 'negative':
+            amount = -amount
+        if amount < 0:
+            raise SkipRow('credit transaction')
+    elif fields.get('debit'):
+        amount = abs(_amount(fields['debit']))
+    elif fields.get('credit'):
+        raise SkipRow('credit transaction')
+    else:
+        raise ValueError('missing amount')
+    if amount == 0:
+        raise ValueError('amount must not be zero')
+
+    if not fields.get('date'):
+        raise ValueError('missing date')
+    day = _parse_date(fields['date'])
+
+    store = (fields.get('store') or '').strip()[:200]
+    if not store:
+        raise ValueError('missing store/description')
+    return day, amount, store, (fields.get('category') or '').strip()[:50] or None
+
+
+class ExpenseImport:
+    """
+    Import parsed statement rows for one user in chunked transactions.
+
+    Each chunk is validated, categorized (memoized per description),
+    checked for duplicates against stored expenses on the same dates and
+    inserted with one executemany INSERT. Duplicates are counted per
+    (date, amount, store) key, so re-importing a statement adds nothing
+    while two identical purchases on one day in a new file are both kept.
+    Month rollups and the data version move in the same transaction, so a
+    failure part-way leaves every committed chunk consistent. Anomaly
+    windows are rebuilt once at the end.
+    """
+
+    def __init__(self, db, user_id, categorizer=None, chunk_size=1000, sign='negative'):
+        if sign not in SIGN_CONVENTIONS:
+            raise ValueError(f"sign must be one of: {', '.join(SIGN_CONVENTIONS)}")
+        self.db = db
+        self.user_id = int(user_id)
+        self.sign = sign
+        self.categorizer = categorizer or ExpenseCategorizer()
+        self.chunk_size = chunk_size
+        self._categories = {}
+        self._file_counts = Counter()
+        self._existing = {}  # day -> Counter of (amount, store key) stored before the import
+        self._store_keys = {}
+        self.imported = 0
+        self.duplicates = 0
+        self.skipped = 0
+        self.errors = []
+        self.error_count = 0
+
+    def _error(self, row_number, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': row_number, 'message': message})
+
+    def _categorize(self, store):
+        category = self._categories.get(store)
+        if category is None:
+            category = self.categorizer.categorize_expense(store)['category']
+            self._categories[store] = category
+        return category
+
+    def _store_key(self, store):
+        key = self._store_keys.get(store)
+        if key is None:
+            key = self._store_keys[store] = normalize_store(store)
+        return key
+
+    def _load_existing(self, rows):
+        """
+        Load stored expenses for dates not seen earlier in the file. Each
+        date is read once, before any row of that date is inserted, so the
+        counts reflect the ledger as it was before the import.
+        """
+        days = {day for day, _, _, _ in rows} - self._existing.keys()
+        if not days:
+            return
+        for day in days:
+            self._existing[day] = Counter()
+        stored = self.db.session.execute(
+            select(Expense.date, Expense.amount, Expense.store).where(
+                Expense.user_id == self.user_id,
+                Expense.date.in_(days),
+            )
+        )
+        for day, amount, store in stored:
+            self._existing[day][(round(amount, 2), self._store_key(store))] += 1
+
+    def _flush(self, rows):
+        if not rows:
+            return
+        self._load_existing(rows)
+        records, deltas = [], []
+        for day, amount, store, category in rows:
+            key = (amount, self._store_key(store))
+            self._file_counts[day, key] += 1
+            # Rows stored before this import started, matched one to one
+            if self._file_counts[day, key] <= self._existing[day][key]:
+                self.duplicates += 1
+                continue
+            category = category or self._categorize(store)
+            records.append({
+                'user_id': self.user_id,
+                'store': store,
+                'amount': amount,
+                'category': category,
+                'date': day,
+                'created_at': datetime.utcnow(),
+            })
+            deltas.append((self.user_id, day, category, amount, 1))
+
+        if records:
+            ids = self.db.session.execute(insert(Expense).returning(Expense.id), records).scalars().all()
+            sync_service.record_ids(self.db, [(self.user_id, 'expenses', expense_id) for expense_id in ids])
+            for user_id, month_deltas in rollup_service.expense_deltas(deltas).items():
+                rollup_service.apply_deltas(self.db, user_id, month_deltas)
+            bump_data_version(self.user_id, self.db)
+        self.db.session.commit()
+        self.imported += len(records)
+
+        index = get_user_merchant_index(self.db, self.user_id)
+        for store in {record['store'] for record in records}:
+            index.add(store)
+
+    def run(self, parsed_rows):
+        """Import (row_number, fields) pairs; returns the import report."""
+        chunk = []
+        for row_number, fields in parsed_rows:
+            try:
+                chunk.append(validate(fields, self.sign))
+            except SkipRow:
+                self.skipped += 1
+                continue
+            except ValueError as e:
+                self._error(row_number, str(e))
+                continue
+            if len(chunk) >= self.chunk_size:
+                self._flush(chunk)
+                chunk = []
+        self._flush(chunk)
+
+        if self.imported:
+            anomaly_service.backfill(self.db, self.user_id)
+            PredictionService.evaluate_budget_alerts(self.user_id, self.db)
+            self.db.session.commit()
+
+        return {
+            'imported': self.imported,
+            'duplicates': self.duplicates,
+            'skipped': self.skipped,
+            'error_count': self.error_count,
+            'errors': self.errors,
+        }
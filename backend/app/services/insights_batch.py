@@ -0,0 +1,118 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from sqlalchemy import insert, update
+
+from app import db
+from app.models import InsightsSnapshot, User
+from app.services.data_version import get_data_version
+from app.services.insights_service import build_insights
+
+# Flask app of a pool worker, created once per process by _init_worker
+_worker_app = None
+
+
+def _init_worker():
+    global _worker_app
+    from app import create_app
+
+    _worker_app = create_app()
+
+
+def compute_shard(user_ids, year, month):
+    """
+    Insights payloads for a list of users, as (user_id, data_version, json)
+    tuples. The version is read before the payload is computed, so a write
+    that lands in between leaves the stored snapshot stale, never wrong.
+    Users that fail are returned with a None payload.
+    """
+    results = []
+    for user_id in user_ids:
+        version = get_data_version(user_id, db)
+        try:
+            payload = json.dumps(build_insights(db, user_id, year, month))
+        except Exception:
+            db.session.rollback()
+            payload = None
+        results.append((user_id, version, payload))
+    return results
+
+
+def _compute_shard_in_worker(args):
+    with _worker_app.app_context():
+        try:
+            return compute_shard(*args)
+        finally:
+            db.session.remove()
+
+
+class InsightsBatchJob:
+    """
+    Precompute the current month's /ai-insights payload for every user.
+
+    Users are split into shards that a process pool computes in parallel;
+    each worker has its own app and database connections. The parent is the
+    only writer and stores each finished shard with executemany statements.
+    """
+
+    def __init__(self, db, workers=None, shard_size=200):
+        self.db = db
+        self.workers = workers or os.cpu_count() or 1
+        self.shard_size = shard_size
+
+    def _store(self, results, year, month):
+        now = datetime.utcnow()
+        user_ids = [user_id for user_id, _, _ in results]
+        existing = dict(
+            self.db.session.query(InsightsSnapshot.user_id, InsightsSnapshot.id)
+            .filter(InsightsSnapshot.user_id.in_(user_ids))
+            .all()
+        )
+
+        updates, inserts = [], []
+        for user_id, version, payload in results:
+            if payload is None:
+                continue
+            values = {'year': year, 'month': month, 'payload': payload, 'data_version': version, 'computed_at': now}
+            if user_id in existing:
+                updates.append({'id': existing[user_id], **values})
+            else:
+                inserts.append({'user_id': user_id, **values})
+
+        if updates:
+            self.db.session.execute(update(InsightsSnapshot), updates)
+        if inserts:
+            self.db.session.execute(insert(InsightsSnapshot), inserts)
+        self.db.session.commit()
+        return len(updates) + len(inserts)
+
+    def run(self, today=None):
+        """Compute and store snapshots for all users; returns run statistics."""
+        started = time.perf_counter()
+        today = today or datetime.now().date()
+        year, month = today.year, today.month
+
+        user_ids = [user_id for (user_id,) in self.db.session.query(User.id).order_by(User.id)]
+        shards = [user_ids[i:i + self.shard_size] for i in range(0, len(user_ids), self.shard_size)]
+
+        stored = 0
+        if self.workers <= 1 or len(shards) <= 1:
+            for shard in shards:
+                stored += self._store(compute_shard(shard, year, month), year, month)
+        else:
+            # Release pooled connections so forked workers do not share them
+            self.db.engine.dispose()
+            with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker) as pool:
+                tasks = [(shard, year, month) for shard in shards]
+                for results in pool.map(_compute_shard_in_worker, tasks):
+                    stored += self._store(results, year, month)
+
+        return {
+            'users': len(user_ids),
+            'stored': stored,
+            'failed': len(user_ids) - stored,
+            'seconds': round(time.perf_counter() - started, 3),
+        }
@@ -0,0 +1,159 @@
+import json
+from datetime import date, datetime
+
+from app.models import Budget, InsightsSnapshot
+from app.services import anomaly_service, rollup_service
+from app.services.aggregation import add_months
+from app.services.data_version import get_data_version
+from app.services.prediction_service import PredictionService
+
+
+def build_insights(db, user_id, year, month):
+    """Compute the /ai-insights payload for one user-month."""
+    current_start = date(year, month, 1)
+    current_end = add_months(current_start, 1)
+    last_start = add_months(current_start, -1)
+
+    # Month totals and category breakdown from the monthly rollups
+    current_total, category_totals = rollup_service.month_totals(
+        db, user_id, current_start, rollup_service.EXPENSE
+    )
+    last_total, _ = rollup_service.month_totals(
+        db, user_id, last_start, rollup_service.EXPENSE
+    )
+
+    change_pct = (
+        ((current_total - last_total) / last_total) * 100.0
+        if last_total > 0
+        else 0.0
+    )
+
+    # Top category
+    top_category = None
+    if category_totals:
+        top_category = max(category_totals.items(), key=lambda kv: kv[1])[0]
+
+    # Forecast (reuse existing prediction service)
+    forecast = PredictionService.get_forecast(user_id, db)
+    forecast_explanation = (
+        "Prediction is based on your last "
+        f"{forecast.get('based_on_months', 0)} month(s) of expenses with recent months weighted more."
+    )
+
+    # Per-category forecast from exponential smoothing over each category's history
+    category_model = PredictionService.forecast_by_category(user_id, db)
+    category_forecast = category_model['by_category']
+
+    # Anomalies: expenses scored against the robust (median/MAD) history of
+    # their own category when they were recorded
+    anomalies = [
+        {
+            "expense_id": expense_id,
+            "store": store,
+            "amount": float(amount),
+            "date": day.isoformat(),
+            "category": category,
+            "score": round(score, 2),
+            "severity": "danger" if score >= 2 * anomaly_service.THRESHOLD else "warning",
+            "message": f"Unusually high {category} expense compared to your history.",
+            "explanation": (
+                f"Flagged because this amount is far above your typical {category} "
+                f"expense of {typical:.2f} (robust z-score {score:.1f})."
+            ),
+        }
+        for expense_id, store, amount, day, category, score, typical in anomaly_service.month_anomalies(
+            db, user_id, current_start, current_end
+        )
+    ]
+
+    # Budget-aware recommendations
+    budget = Budget.query.filter_by(user_id=user_id).first()
+    recommendations = []
+
+    if change_pct > 10:
+        recommendations.append(
+            {
+                "suggestion": "Review and tighten budgets in your top spending categories.",
+                "reason": f"You spent {change_pct:.1f}% more than last month.",
+            }
+        )
+    elif change_pct < -10:
+        recommendations.append(
+            {
+                "suggestion": "Consider increasing your savings target this month.",
+                "reason": f"You spent {abs(change_pct):.1f}% less than last month.",
+            }
+        )
+
+    if budget and current_total >= 0.8 * budget.monthly_limit:
+        recommendations.append(
+            {
+                "suggestion": "Reduce discretionary categories (like Shopping or Entertainment) for the rest of the month.",
+                "reason": "You have already used more than 80% of your monthly budget.",
+            }
+        )
+
+    summary_text = (
+        "Your spending is consistent with last month."
+    )
+    if change_pct > 10:
+        summary_text = (
+            f"You spent {change_pct:.1f}% more this month compared to last month. "
+            "Consider reviewing categories with the biggest increases."
+        )
+    elif change_pct < -10:
+        summary_text = (
+            f"Great job! You spent {abs(change_pct):.1f}% less this month compared to last month."
+        )
+
+    return {
+        "period": {"month": month, "year": year},
+        "spending_pattern": {
+            "current_total": float(current_total),
+            "last_total": float(last_total),
+            "change_percentage": round(change_pct, 2),
+            "trend": "increasing"
+            if change_pct > 0
+            else "decreasing"
+            if change_pct < 0
+            else "stable",
+            "top_category": top_category,
+            "explanation": "Spending pattern analysis compares this month to the previous month and highlights categories where you spend the most.",
+        },
+        "forecast": {
+            **forecast,
+            "by_category": category_forecast,
+            "category_model": {
+                "method": category_model["method"],
+                "month": category_model["month"],
+                "interval": category_model["interval"],
+                "total": category_model["total"],
+            },
+            "explanation": forecast_explanation,
+        },
+        "budget_recommendations": recommendations,
+        "anomalies": anomalies,
+        "explainability": {
+            "what": summary_text,
+            "why": "Insights are generated from your last two months of expenses and your configured budget.",
+            "next_steps": "Use these insights to adjust category budgets, reduce high-risk expenses, and increase savings when your spending decreases.",
+        },
+    }
+
+
+def get_insights(db, user_id, year, month, today=None):
+    """
+    The insights payload for a user-month. For the current month a stored
+    snapshot is served while the user's data version is unchanged;
+    otherwise the payload is computed live.
+    """
+    today = today or datetime.now().date()
+    if (year, month) == (today.year, today.month):
+        snapshot = InsightsSnapshot.query.filter_by(user_id=int(user_id)).first()
+        if (
+            snapshot is not None
+            and (snapshot.year, snapshot.month) == (year, month)
+            and snapshot.data_version == get_data_version(user_id, db)
+        ):
+            return json.loads(snapshot.payload)
+    return build_insights(db, user_id, year, month)
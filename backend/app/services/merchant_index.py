@@ -0,0 +1,281 @@
+import re
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Dict, List, Optional, Set
+
+from app.services.simple_ml_service import SimpleExpenseCategorizer
+
+_NON_ALNUM = re.compile(r'[^a-z0-9]+')
+_STORE_NUMBER = re.compile(r'#\s*\d+')
+
+# Trailing words that describe the outlet rather than the merchant
+# ("WALMART SUPERCENTER", "CVS PHARMACY #123", "AMAZON.COM").
+_NOISE_WORDS = (
+    'store', 'stores', 'supercenter', 'superstore', 'wholesale', 'center', 'centre',
+    'express', 'station', 'pharmacy', 'coffee', 'restaurant', 'oil', 'com', 'online',
+    'inc', 'llc', 'ltd', 'co', 'corp', 'company',
+)
+
+# Keys shorter than this only ever match exactly; fuzzy matching "bp" or
+# "kfc" would pull in half the receipts.
+_MIN_FUZZY_LENGTH = 4
+# Merchant names rarely span more than this many words.
+_MAX_NAME_TOKENS = 3
+_MAX_CANDIDATES = 8
+
+# Bounds on one index: merchants indexed, and exact spellings (aliases
+# included) remembered. Once full, unknown stores are not added.
+MAX_MERCHANTS = 20000
+MAX_KEYS = 100000
+
+# Per-user indexes: stores loaded from a user's history on first use, and
+# how many users' indexes a process keeps (least recently used evicted)
+MAX_USER_STORES = 2000
+MAX_USER_INDEXES = 256
+
+
+def tokenize_store(name: str) -> List[str]:
+    """Lowercase words of a store name with punctuation and store numbers removed."""
+    if not name:
+        return []
+    text = _STORE_NUMBER.sub(' ', name.lower())
+    return [token for token in _NON_ALNUM.split(text) if token and not token.isdigit()]
+
+
+def normalize_store(name: str) -> str:
+    """Compact lookup key for a store name ("Wal-Mart #12" -> "walmart")."""
+    return ''.join(tokenize_store(name))
+
+
+def _is_noise(token: str) -> bool:
+    if token in _NOISE_WORDS:
+        return True
+    # OCR truncates and garbles these too ("SUPERCENTR")
+    return len(token) >= 6 and any(
+        len(word) >= 6 and _bounded_levenshtein(token, word, 2) <= 2 for word in _NOISE_WORDS
+    )
+
+
+def _trigrams(key: str) -> Set[str]:
+    padded = f'^{key}$'
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _bounded_levenshtein(a: str, b: str, max_distance: int) -> int:
+    """Edit distance between a and b, or max_distance + 1 once it is exceeded."""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        row_min = i
+        for j, cb in enumerate(b, 1):
+            cost = previous[j - 1] + (ca != cb)
+            value = min(previous[j] + 1, current[j - 1] + 1, cost)
+            current.append(value)
+            if value < row_min:
+                row_min = value
+        if row_min > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+
+def _allowed_distance(key: str) -> int:
+    return max(1, len(key) // 4)
+
+
+class MerchantIndex:
+    """
+    Trigram inverted index over known merchant names.
+
+    Store strings are reduced to compact keys. Exact keys (including every
+    spelling seen before) resolve with a dict lookup; anything else gathers
+    candidates from the trigram postings and verifies the best few with a
+    bounded edit distance. Leading words are tried as the merchant name when
+    the remaining words are outlet noise, so "WALMART SUPERCENTR" resolves
+    to "Walmart" while "Marketplace Pizza" does not collapse to "Market".
+
+    Lookups and writes share one lock: request threads add stores while
+    others look them up. The index holds at most `max_merchants` merchants
+    and `max_keys` spellings. Stores it does not know are looked up in the
+    `fallback` index, if any.
+    """
+
+    def __init__(self, max_merchants: int = MAX_MERCHANTS, max_keys: int = MAX_KEYS,
+                 fallback: Optional['MerchantIndex'] = None):
+        self.max_merchants = max_merchants
+        self.max_keys = max_keys
+        self.fallback = fallback
+        self._lock = threading.Lock()
+        self._keys: List[str] = []
+        self._names: List[str] = []
+        self._exact: Dict[str, int] = {}
+        self._postings: Dict[str, Set[int]] = defaultdict(set)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _insert(self, key: str, name: str) -> int:
+        merchant_id = len(self._keys)
+        self._keys.append(key)
+        self._names.append(name)
+        self._exact[key] = merchant_id
+        if len(key) >= _MIN_FUZZY_LENGTH:
+            for gram in _trigrams(key):
+                self._postings[gram].add(merchant_id)
+        return merchant_id
+
+    def _match_key(self, key: str) -> Optional[int]:
+        merchant_id = self._exact.get(key)
+        if merchant_id is not None or len(key) < _MIN_FUZZY_LENGTH:
+            return merchant_id
+
+        overlap: Dict[int, int] = defaultdict(int)
+        for gram in _trigrams(key):
+            for candidate in self._postings.get(gram, ()):
+                overlap[candidate] += 1
+        if not overlap:
+            return None
+
+        ranked = sorted(overlap, key=overlap.get, reverse=True)[:_MAX_CANDIDATES]
+        best_id, best_rank = None, None
+        for candidate in ranked:
+            cand_key = self._keys[candidate]
+            limit = _allowed_distance(cand_key)
+            distance = _bounded_levenshtein(key, cand_key, limit)
+            if distance > limit:
+                continue
+            # Prefer closer matches, then longer (more specific) merchants
+            rank = (distance, -len(cand_key))
+            if best_rank is None or rank < best_rank:
+                best_id, best_rank = candidate, rank
+        return best_id
+
+    def _match_tokens(self, tokens: List[str], strict: bool) -> Optional[int]:
+        if strict:
+            # Only words followed exclusively by outlet noise may name the merchant
+            first = len(tokens)
+            while first > 0 and _is_noise(tokens[first - 1]):
+                first -= 1
+            if first == 0:
+                # "STORE #12" or "PHARMACY" on its own names no merchant
+                return None
+            heads = range(len(tokens), first - 1, -1)
+        else:
+            heads = range(min(len(tokens), _MAX_NAME_TOKENS), 0, -1)
+        for size in heads:
+            merchant_id = self._match_key(''.join(tokens[:size]))
+            if merchant_id is not None:
+                return merchant_id
+        return None
+
+    def lookup(self, raw: str, strict: bool = True) -> Optional[str]:
+        """
+        Return the canonical merchant name for a raw store string, if any.
+
+        With strict=False the merchant only has to lead the text, which suits
+        categorizer input where item names follow the store.
+        """
+        tokens = tokenize_store(raw)
+        if not tokens:
+            return None
+        with self._lock:
+            merchant_id = self._match_tokens(tokens, strict)
+            if merchant_id is not None:
+                return self._names[merchant_id]
+        return self.fallback.lookup(raw, strict) if self.fallback is not None else None
+
+    def canonicalize(self, raw: str) -> str:
+        """Map a raw store string to its canonical name, falling back to the input."""
+        return self.lookup(raw) or (raw.strip() if raw else raw)
+
+    def add(self, raw: str, canonical: Optional[str] = None) -> Optional[str]:
+        """
+        Register a store name. Spellings that resolve to an existing merchant
+        become exact aliases of it; anything else is indexed as a new merchant
+        while the index has room. Returns the canonical name, or None.
+        """
+        tokens = tokenize_store(raw)
+        if not tokens:
+            return None
+        key = ''.join(tokens)
+        known = self.fallback.lookup(raw) if self.fallback is not None else None
+        with self._lock:
+            merchant_id = self._match_tokens(tokens, strict=True)
+            if merchant_id is None and known is not None:
+                return known
+            if merchant_id is None:
+                if len(self._keys) >= self.max_merchants or len(self._exact) >= self.max_keys:
+                    return None
+                merchant_id = self._insert(key, canonical or raw.strip())
+            elif len(self._exact) < self.max_keys:
+                self._exact.setdefault(key, merchant_id)
+            return self._names[merchant_id]
+
+    def load_from_db(self, db, user_id):
+        """
+        Index the user's historical `Expense.store` values up to the index
+        bounds, most used first.
+        """
+        from sqlalchemy import func
+
+        from app.models import Expense
+
+        stores = (
+            db.session.query(Expense.store)
+            .filter(Expense.user_id == int(user_id))
+            .group_by(Expense.store)
+            .order_by(func.count(Expense.id).desc())
+            .limit(self.max_keys)
+        )
+        for (store,) in stores:
+            if len(self._keys) >= self.max_merchants and len(self._exact) >= self.max_keys:
+                break
+            self.add(store)
+
+
+def _build_default_index() -> MerchantIndex:
+    index = MerchantIndex()
+    for keywords in SimpleExpenseCategorizer().category_keywords.values():
+        for keyword in keywords:
+            index.add(keyword, canonical=keyword.title())
+    return index
+
+
+_default_index: Optional[MerchantIndex] = None
+_default_lock = threading.Lock()
+_user_indexes: OrderedDict = OrderedDict()  # (engine, user_id) -> MerchantIndex
+
+
+def get_merchant_index() -> MerchantIndex:
+    """Process-wide merchant index seeded with the categorizer keywords only."""
+    global _default_index
+    if _default_index is None:
+        with _default_lock:
+            if _default_index is None:
+                _default_index = _build_default_index()
+    return _default_index
+
+
+def get_user_merchant_index(db, user_id) -> MerchantIndex:
+    """
+    Merchant index of one user's own store spellings, backed by the shared
+    keyword index. Built from the user's history on first use in this
+    process, so other users' payees never shape their normalization.
+    """
+    key = (db.engine, int(user_id))
+    with _default_lock:
+        index = _user_indexes.get(key)
+        if index is not None:
+            _user_indexes.move_to_end(key)
+            return index
+
+    index = MerchantIndex(MAX_USER_STORES, MAX_USER_STORES * 4, fallback=get_merchant_index())
+    index.load_from_db(db, user_id)
+    with _default_lock:
+        index = _user_indexes.setdefault(key, index)
+        _user_indexes.move_to_end(key)
+        while len(_user_indexes) > MAX_USER_INDEXES:
+            _user_indexes.popitem(last=False)
+    return index
@@ -6,6 +6,8 @@ from sklearn.naive_bayes import MultinomialNB
 from sklearn.pipeline import Pipeline
 import joblib
 
+from app.services.merchant_index import get_merchant_index
+
 class ExpenseCategorizer:
     def __init__(self):
         self.model = None
@@ -99,18 +101,50 @@ class ExpenseCategorizer:
         
         return predicted_category, float(confidence)
     
-    def categorize_expense(self, store_name, items=None):
+    def predict_batch(self, texts):
         """
-        Categorize expense based on store name and items
+        Predict categories for many texts in one vectorized call
+        Returns: list of (category, confidence)
+        """
+        if not texts or not self.model:
+            return [('Other', 0.0) for _ in texts or []]
+        
+        probabilities = self.model.predict_proba([(text or '').lower() for text in texts])
+        predicted_idx = np.argmax(probabilities, axis=1)
+        confidences = probabilities[np.arange(len(texts)), predicted_idx]
+        
+        return [
+            (self.model.classes_[idx], float(conf))
+            for idx, conf in zip(predicted_idx, confidences)
+        ]
+    
+    def expense_text(self, store_name, items=None):
         """
-        # Combine store name and items for better prediction
-        text = store_name.lower()
+        Model input for an expense: canonical store name plus item names
+        """
+        text = get_merchant_index().canonicalize(store_name).lower()
         if items:
             text += ' ' + ' '.join(items).lower()
-        
-        category, confidence = self.predict(text)
+        return text
+    
+    def categorize_expense(self, store_name, items=None):
+        """
+        Categorize expense based on store name and items
+        """
+        category, confidence = self.predict(self.expense_text(store_name, items))
         
         return {
             'predicted_category': category,
             'confidence': confidence
         }
+    
+    def categorize_batch(self, expenses):
+        """
+        categorize_expense over many (store_name, items) pairs: the same
+        preprocessing per expense, then one vectorized prediction
+        """
+        texts = [self.expense_text(store_name, items) for store_name, items in expenses]
+        return [
+            {'predicted_category': category, 'confidence': confidence}
+            for category, confidence in self.predict_batch(texts)
+        ]
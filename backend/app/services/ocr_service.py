@@ -6,6 +6,8 @@ import re
 from datetime import datetime
 import os
 
+from app.services.merchant_index import get_merchant_index
+
 class OCRService:
     def __init__(self):
         # Set Tesseract path (update based on installation)
@@ -165,7 +167,7 @@ class OCRService:
             raise Exception(f"OCR extraction failed: {str(e)}")
     
     
-    def extract_structured_data(self, text):
+    def extract_structured_data(self, text, merchant_index=None):
         """
         Enhanced structured data extraction from OCR text
         Returns: store, items, amount, date with improved parsing
@@ -202,6 +204,19 @@ class OCRService:
             if result['store'] != 'Unknown Store':
                 break
         
+        # Normalize noisy store names to a canonical merchant, falling back
+        # to the merchant index when no pattern matched
+        if merchant_index is None:
+            merchant_index = get_merchant_index()
+        if result['store'] != 'Unknown Store':
+            result['store'] = merchant_index.canonicalize(result['store'])
+        else:
+            for line in lines[:5]:
+                merchant = merchant_index.lookup(line)
+                if merchant:
+                    result['store'] = merchant
+                    break
+        
         # Enhanced amount extraction with multiple patterns
         amount_patterns = [
             r'total[:\s]*\$?([0-9]+\.?[0-9]*)',
@@ -376,7 +391,7 @@ class OCRService:
         
         return result
     
-    def process_receipt(self, image_path):
+    def process_receipt(self, image_path, merchant_index=None):
         """
         Enhanced OCR pipeline: preprocess -> extract -> structure
         """
@@ -388,7 +403,7 @@ class OCRService:
             print(f"Extracted text: {raw_text[:200]}...")  # First 200 chars for debug
             
             # Extract structured data with enhanced parsing
-            structured_data = self.extract_structured_data(raw_text)
+            structured_data = self.extract_structured_data(raw_text, merchant_index)
             
             # Add processing metadata
             structured_data['raw_text'] = raw_text
@@ -2,6 +2,16 @@ import numpy as np
 from datetime import datetime, timedelta
 from sqlalchemy import func
 from app.models import Expense
+from app.services.data_version import VersionedCache, get_data_version
+from app.services.forecasting_engine import CategoryForecaster
+from app.services.aggregation import (
+    add_months, month_bucket, month_from_index, month_index, month_key, month_start
+)
+
+# Per-process forecast cache keyed on (user, day) and validated against the
+# user's data version
+_forecast_cache = VersionedCache(maxsize=4096)
+_category_forecaster = CategoryForecaster()
 
 class PredictionService:
     @staticmethod
@@ -11,16 +21,20 @@ class PredictionService:
         Simple moving average with trend analysis
         """
         # Get last 6 months of expenses
-        six_months_ago = datetime.now() - timedelta(days=180)
+        now = datetime.now()
+        six_months_ago = now - timedelta(days=180)
+        next_month = add_months(now, 1)
+        month = month_bucket(Expense.date, six_months_ago, now).label('month')
         
         # Query monthly totals
         monthly_totals = db.session.query(
-            func.strftime('%Y-%m', Expense.date).label('month'),
+            month,
             func.sum(Expense.amount).label('total')
         ).filter(
             Expense.user_id == user_id,
-            Expense.date >= six_months_ago
-        ).group_by('month').all()
+            Expense.date >= six_months_ago,
+            Expense.date < next_month
+        ).group_by(month).order_by(month).all()
         
         if not monthly_totals:
             return {
@@ -34,10 +48,10 @@ class PredictionService:
         
         # Calculate simple moving average
         if len(amounts) >= 3:
-            # Use weighted average (recent months have more weight)
-            weights = np.array([1, 2, 3])[-len(amounts):]
+            # Use weighted average of the last 3 months (recent months have more weight)
+            weights = np.array([1, 2, 3])
             weights = weights / weights.sum()
-            predicted_amount = np.average(amounts, weights=weights)
+            predicted_amount = np.average(amounts[-3:], weights=weights)
         else:
             predicted_amount = np.mean(amounts)
         
@@ -57,51 +71,187 @@ class PredictionService:
         }
     
     @staticmethod
-    def get_budget_alerts(user_id, db):
+    def get_forecast(user_id, db):
         """
-        Generate budget alerts based on current spending
+        Next month's forecast, reused until the user's data changes.
+        
+        Served from the in-process cache when it was computed today at the
+        user's current data version, then from the precomputed forecasts
+        table (same month, same version), and computed on demand otherwise
         """
-        from app.models import Budget
+        from app.models import SpendingForecast
         
-        alerts = []
+        version = get_data_version(user_id, db)
+        # The 6-month window slides daily, so cached results expire at midnight
+        cache_key = (int(user_id), datetime.now().date())
+        cached = _forecast_cache.get(cache_key, version)
+        if cached is not None:
+            return dict(cached)
         
-        # Get user's budget
-        budget = Budget.query.filter_by(user_id=user_id).first()
-        if not budget:
-            return alerts
+        forecast = None
+        stored = SpendingForecast.query.filter_by(user_id=user_id).first()
+        if stored and stored.data_version == version:
+            now = datetime.utcnow()
+            if stored.computed_at.year == now.year and stored.computed_at.month == now.month:
+                forecast = stored.to_dict()
         
-        # Get current month's spending
-        now = datetime.now()
-        month_start = datetime(now.year, now.month, 1)
+        if forecast is None:
+            forecast = PredictionService.predict_next_month_spending(user_id, db)
+        
+        _forecast_cache.set(cache_key, version, forecast)
+        return dict(forecast)
+    
+    @staticmethod
+    def forecast_by_category(user_id, db, lookback_months=36):
+        """
+        Total and per-category forecast for next calendar month with
+        prediction intervals, from exponential smoothing over each
+        category's complete monthly history
+        """
+        version = get_data_version(user_id, db)
+        today = datetime.now().date()
+        cache_key = ('categories', int(user_id), today)
+        cached = _forecast_cache.get(cache_key, version)
+        if cached is not None:
+            return cached
         
-        current_spending = db.session.query(
+        current = month_index(today)
+        since = month_from_index(current - lookback_months)
+        month = month_bucket(Expense.date, since, today).label('month')
+        
+        rows = db.session.query(
+            Expense.category,
+            month,
             func.sum(Expense.amount)
         ).filter(
             Expense.user_id == user_id,
-            Expense.date >= month_start
-        ).scalar() or 0.0
+            Expense.date >= since,
+            Expense.date < month_from_index(current + 1)
+        ).group_by(Expense.category, month).all()
+        
+        observed = [(category, month_index(bucket), total) for category, bucket, total in rows]
+        complete = [m for _, m, _ in observed if m < current]
+        # Fit on complete months; the current month only counts when it is all we have
+        start = min(complete) if complete else current
+        end = current - 1 if complete else current
+        
+        categories = sorted({category for category, m, _ in observed if start <= m <= end})
+        matrix = np.zeros((len(categories), end - start + 1))
+        positions = {category: i for i, category in enumerate(categories)}
+        for category, m, total in observed:
+            if start <= m <= end:
+                matrix[positions[category], m - start] = total
         
-        # Calculate percentage
-        percentage = (current_spending / budget.monthly_limit) * 100 if budget.monthly_limit > 0 else 0
+        target = current + 1
+        result = _category_forecaster.forecast(matrix, horizon=target - end)
         
-        # Generate alerts
+        total_point = float(result['point'].sum())
+        total_sd = float(np.sqrt(result['variance'].sum()))
+        z = _category_forecaster.z
+        by_category = [
+            {
+                'category': category,
+                'predicted_amount': round(float(result['point'][i]), 2),
+                'lower': round(float(result['lower'][i]), 2),
+                'upper': round(float(result['upper'][i]), 2),
+                'share': round(float(result['point'][i]) / total_point * 100.0, 1) if total_point > 0 else 0.0,
+            }
+            for i, category in enumerate(categories)
+        ]
+        by_category.sort(key=lambda row: row['predicted_amount'], reverse=True)
+        
+        forecast = {
+            'month': month_key(month_from_index(target)),
+            'method': result['method'],
+            'based_on_months': int(result['months']) if categories else 0,
+            'interval': _category_forecaster.interval,
+            'total': {
+                'predicted_amount': round(total_point, 2),
+                'lower': round(max(total_point - z * total_sd, 0.0), 2),
+                'upper': round(total_point + z * total_sd, 2),
+            },
+            'by_category': by_category,
+        }
+        _forecast_cache.set(cache_key, version, forecast)
+        return forecast
+    
+    @staticmethod
+    def _alert_for(percentage, spent, limit, currency, label=None):
+        """Build one alert dict for spending against a limit, or None"""
+        noun = f'{label} budget' if label else 'budget'
         if percentage >= 100:
-            alerts.append({
+            return {
                 'type': 'danger',
-                'message': f'Budget exceeded! You have spent {budget.currency} {current_spending:.2f} of {budget.currency} {budget.monthly_limit:.2f}',
+                'message': f'{noun[:1].upper()}{noun[1:]} exceeded! You have spent {currency} {spent:.2f} of {currency} {limit:.2f}',
                 'percentage': round(percentage, 1)
-            })
-        elif percentage >= 80:
-            alerts.append({
+            }
+        if percentage >= 80:
+            return {
                 'type': 'warning',
-                'message': f'Almost at budget limit! {percentage:.1f}% spent',
+                'message': f'Almost at {noun} limit! {percentage:.1f}% spent',
                 'percentage': round(percentage, 1)
-            })
-        elif percentage >= 50:
-            alerts.append({
+            }
+        if percentage >= 50:
+            return {
                 'type': 'info',
-                'message': f'Halfway through budget: {percentage:.1f}% spent',
+                'message': f'Halfway through {noun}: {percentage:.1f}% spent',
                 'percentage': round(percentage, 1)
-            })
+            }
+        return None
+    
+    @staticmethod
+    def evaluate_budget_alerts(user_id, db, month=None):
+        """
+        Re-evaluate and store budget alerts for one user-month from the
+        running month totals. Called in the same transaction as the write
+        that changed spending or budgets; the caller commits
+        """
+        from app.models import Budget, CategoryBudget, BudgetAlert
+        from app.services.rollup_service import month_totals
+        
+        user_id = int(user_id)
+        month = month or month_start(datetime.now())
+        
+        BudgetAlert.query.filter_by(user_id=user_id, month=month).delete(synchronize_session=False)
+        
+        budget = Budget.query.filter_by(user_id=user_id).first()
+        category_budgets = CategoryBudget.query.filter_by(user_id=user_id).all()
+        if not budget and not category_budgets:
+            return []
         
+        current_spending, by_category = month_totals(db, user_id, month)
+        currency = budget.currency if budget else 'USD'
+        
+        alerts = []
+        if budget:
+            percentage = (current_spending / budget.monthly_limit) * 100 if budget.monthly_limit > 0 else 0
+            alert = PredictionService._alert_for(percentage, current_spending, budget.monthly_limit, currency)
+            if alert:
+                alerts.append(alert)
+        
+        for category_budget in category_budgets:
+            spent = by_category.get(category_budget.category, 0.0)
+            limit = category_budget.monthly_limit
+            percentage = (spent / limit) * 100 if limit > 0 else 0
+            alert = PredictionService._alert_for(percentage, spent, limit, currency, label=category_budget.category)
+            if alert:
+                alert['category'] = category_budget.category
+                alerts.append(alert)
+        
+        for alert in alerts:
+            db.session.add(BudgetAlert(user_id=user_id, month=month, **alert))
         return alerts
+    
+    @staticmethod
+    def get_budget_alerts(user_id, db):
+        """
+        Budget alerts for the current month, as stored at write time
+        """
+        from app.models import BudgetAlert
+        
+        alerts = BudgetAlert.query.filter_by(
+            user_id=user_id,
+            month=month_start(datetime.now())
+        ).order_by(BudgetAlert.category.isnot(None), BudgetAlert.category).all()
+        
+        return [alert.to_dict() for alert in alerts]
@@ -0,0 +1,153 @@
+from datetime import date, timedelta
+
+from sqlalchemy import select
+
+from app.models import Expense, Income, MonthlyRollup
+from app.services.aggregation import add_months, month_start
+from app.services.rollup_service import EXPENSE, INCOME
+
+GRANULARITIES = ('day', 'week', 'month', 'quarter')
+# Upper bound on series length, e.g. ten years of days
+MAX_BUCKETS = 3700
+# Rows per fetch when streaming ledger rows
+STREAM_BATCH = 5000
+
+
+def bucket_start(day, granularity):
+    """First day of the bucket containing `day`."""
+    if granularity == 'day':
+        return day
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return month_start(day)
+    return date(day.year, (day.month - 1) // 3 * 3 + 1, 1)
+
+
+def next_bucket(start, granularity):
+    if granularity == 'day':
+        return start + timedelta(days=1)
+    if granularity == 'week':
+        return start + timedelta(days=7)
+    return add_months(start, 1 if granularity == 'month' else 3)
+
+
+def bucket_label(start, granularity):
+    if granularity == 'week':
+        year, week, _ = start.isocalendar()
+        return f'{year}-W{week:02d}'
+    if granularity == 'month':
+        return start.strftime('%Y-%m')
+    if granularity == 'quarter':
+        return f'{start.year}-Q{(start.month - 1) // 3 + 1}'
+    return start.isoformat()
+
+
+def bucket_count(start, end, granularity):
+    """Number of buckets a [start, end] range spans."""
+    first, last = bucket_start(start, granularity), bucket_start(end, granularity)
+    if granularity == 'day':
+        return (last - first).days + 1
+    if granularity == 'week':
+        return (last - first).days // 7 + 1
+    months = (last.year - first.year) * 12 + last.month - first.month
+    return months + 1 if granularity == 'month' else months // 3 + 1
+
+
+class RangeSummary:
+    """
+    Running totals for one user over [start, end], bucketed by granularity.
+
+    Memory is proportional to buckets x categories, never to the number of
+    transactions: rows are folded in as they arrive, either from monthly
+    rollups (whole months, month/quarter granularity) or streamed from the
+    ledger in batches with a server-side cursor.
+    """
+
+    def __init__(self, start, end, granularity):
+        self.start, self.end, self.granularity = start, end, granularity
+        self.series = {}
+        self.by_category = {EXPENSE: {}, INCOME: {}}
+
+    def add(self, day, category, kind, amount):
+        bucket = self.series.setdefault(bucket_start(day, self.granularity), {EXPENSE: 0.0, INCOME: 0.0})
+        bucket[kind] += amount
+        categories = self.by_category[kind]
+        categories[category] = categories.get(category, 0.0) + amount
+
+    def add_rollups(self, db, user_id, first_month, last_month):
+        rows = db.session.execute(
+            select(MonthlyRollup.month, MonthlyRollup.category, MonthlyRollup.kind, MonthlyRollup.total)
+            .where(
+                MonthlyRollup.user_id == int(user_id),
+                MonthlyRollup.month >= first_month,
+                MonthlyRollup.month <= last_month,
+                MonthlyRollup.count > 0,
+            )
+        )
+        for month, category, kind, total in rows:
+            self.add(month, category, kind, total)
+
+    def add_ledger(self, db, user_id, first_day, last_day):
+        for model, kind in ((Expense, EXPENSE), (Income, INCOME)):
+            result = db.session.execute(
+                select(model.date, model.category, model.amount)
+                .where(model.user_id == int(user_id), model.date >= first_day, model.date <= last_day)
+                .execution_options(yield_per=STREAM_BATCH)
+            )
+            for batch in result.partitions():
+                for day, category, amount in batch:
+                    self.add(day, category, kind, amount)
+
+    def load(self, db, user_id):
+        """Fold in all of the user's rows in the range, preferring rollups for whole months."""
+        if self.granularity in ('month', 'quarter'):
+            first_full = month_start(self.start)
+            if first_full < self.start:
+                first_full = add_months(first_full, 1)
+            after_full = month_start(self.end + timedelta(days=1))
+            if first_full < after_full:
+                if self.start < first_full:
+                    self.add_ledger(db, user_id, self.start, first_full - timedelta(days=1))
+                self.add_rollups(db, user_id, first_full, add_months(after_full, -1))
+                if after_full <= self.end:
+                    self.add_ledger(db, user_id, after_full, self.end)
+                return self
+        self.add_ledger(db, user_id, self.start, self.end)
+        return self
+
+    def to_dict(self):
+        series = []
+        bucket = bucket_start(self.start, self.granularity)
+        while bucket <= self.end:
+            values = self.series.get(bucket, {EXPENSE: 0.0, INCOME: 0.0})
+            series.append({
+                'period': bucket_label(bucket, self.granularity),
+                'start': bucket.isoformat(),
+                'income': round(values[INCOME], 2),
+                'expenses': round(values[EXPENSE], 2),
+                'net': round(values[INCOME] - values[EXPENSE], 2),
+            })
+            bucket = next_bucket(bucket, self.granularity)
+
+        def categories(kind):
+            totals = sorted(self.by_category[kind].items(), key=lambda kv: kv[1], reverse=True)
+            return [{'category': c, 'amount': round(a, 2)} for c, a in totals if round(a, 2)]
+
+        income = sum(self.by_category[INCOME].values())
+        expenses = sum(self.by_category[EXPENSE].values())
+        return {
+            'range': {
+                'start': self.start.isoformat(),
+                'end': self.end.isoformat(),
+                'granularity': self.granularity,
+            },
+            'totals': {
+                'income': round(income, 2),
+                'expenses': round(expenses, 2),
+                'net': round(income - expenses, 2),
+            },
+            'expenses_by_category': categories(EXPENSE),
+            'income_by_category': categories(INCOME),
+            'series': series,
+        }
@@ -0,0 +1,176 @@
+from collections import defaultdict
+
+from sqlalchemy import bindparam, func, insert, update
+
+from app.models import Expense, Income, MonthlyRollup
+from app.services.aggregation import month_bucket, month_start
+
+EXPENSE = 'expense'
+INCOME = 'income'
+
+
+def apply_delta(db, user_id, month, category, kind, amount, count):
+    """
+    Add amount/count to one (user, month, category, kind) counter inside the
+    caller's transaction, creating the row on first use.
+    """
+    user_id = int(user_id)
+    updated = (
+        MonthlyRollup.query.filter_by(user_id=user_id, month=month, category=category, kind=kind)
+        .update(
+            {
+                MonthlyRollup.total: MonthlyRollup.total + amount,
+                MonthlyRollup.count: MonthlyRollup.count + count,
+            },
+            synchronize_session=False,
+        )
+    )
+    if not updated:
+        db.session.add(MonthlyRollup(
+            user_id=user_id, month=month, category=category, kind=kind, total=amount, count=count,
+        ))
+        # Flush so a second delta for the same key in this transaction updates it
+        db.session.flush()
+
+
+_ADD_TO_ROLLUP = (
+    update(MonthlyRollup)
+    .where(MonthlyRollup.id == bindparam('rollup_id'))
+    .values(
+        total=MonthlyRollup.total + bindparam('delta_total'),
+        count=MonthlyRollup.count + bindparam('delta_count'),
+    )
+)
+
+
+def apply_deltas(db, user_id, deltas, kind=EXPENSE):
+    """
+    Apply {(month, category): [amount, count]} deltas for one user: one
+    SELECT for the existing counters, then one executemany UPDATE and one
+    executemany INSERT, however many months and categories are touched.
+    """
+    deltas = {key: value for key, value in deltas.items() if value[0] or value[1]}
+    if not deltas:
+        return
+    user_id = int(user_id)
+    existing = {
+        (month, category): rollup_id
+        for rollup_id, month, category in db.session.query(
+            MonthlyRollup.id, MonthlyRollup.month, MonthlyRollup.category
+        ).filter(
+            MonthlyRollup.user_id == user_id,
+            MonthlyRollup.kind == kind,
+            MonthlyRollup.month.in_({month for month, _ in deltas}),
+        )
+    }
+
+    updates, inserts = [], []
+    for (month, category), (amount, count) in deltas.items():
+        if (month, category) in existing:
+            updates.append({'rollup_id': existing[(month, category)], 'delta_total': amount, 'delta_count': count})
+        else:
+            inserts.append({
+                'user_id': user_id, 'month': month, 'category': category, 'kind': kind,
+                'total': amount, 'count': count,
+            })
+    if updates:
+        db.session.connection().execute(_ADD_TO_ROLLUP, updates)
+    if inserts:
+        db.session.execute(insert(MonthlyRollup), inserts)
+
+
+def record_expense(db, expense, sign=1):
+    """Count an expense in (sign=1) or out of (sign=-1) its month's totals."""
+    apply_delta(
+        db, expense.user_id, month_start(expense.date), expense.category, EXPENSE,
+        sign * expense.amount, sign,
+    )
+
+
+def record_income(db, income, sign=1):
+    """Count an income in (sign=1) or out of (sign=-1) its month's totals."""
+    apply_delta(
+        db, income.user_id, month_start(income.date), income.category, INCOME,
+        sign * income.amount, sign,
+    )
+
+
+def move_expense(db, expense, old_category, new_category):
+    """Move an expense's amount between category counters after recategorization."""
+    if old_category == new_category:
+        return
+    month = month_start(expense.date)
+    apply_delta(db, expense.user_id, month, old_category, EXPENSE, -expense.amount, -1)
+    apply_delta(db, expense.user_id, month, new_category, EXPENSE, expense.amount, 1)
+
+
+def month_totals(db, user_id, month, kind=EXPENSE):
+    """Return (overall_total, {category: total}) for one user-month."""
+    rows = (
+        db.session.query(MonthlyRollup.category, MonthlyRollup.total)
+        .filter(
+            MonthlyRollup.user_id == int(user_id),
+            MonthlyRollup.month == month,
+            MonthlyRollup.kind == kind,
+            MonthlyRollup.count > 0,
+        )
+        .all()
+    )
+    by_category = dict(rows)
+    return sum(by_category.values()), by_category
+
+
+def _rebuild_kind(db, model, kind, user_id=None):
+    query = db.session.query(func.min(model.date), func.max(model.date))
+    if user_id is not None:
+        query = query.filter(model.user_id == user_id)
+    first, last = query.one()
+    if first is None:
+        return 0
+
+    month = month_bucket(model.date, first, last)
+    query = db.session.query(
+        model.user_id, month, model.category, func.sum(model.amount), func.count(model.id)
+    )
+    if user_id is not None:
+        query = query.filter(model.user_id == user_id)
+    rows = [
+        {
+            'user_id': uid,
+            'month': bucket,
+            'category': category,
+            'kind': kind,
+            'total': total,
+            'count': count,
+        }
+        for uid, bucket, category, total, count in query.group_by(model.user_id, month, model.category)
+    ]
+    if rows:
+        db.session.execute(insert(MonthlyRollup), rows)
+    return len(rows)
+
+
+def rebuild_rollups(db, user_id=None):
+    """Recompute all counters from the ledger; returns the number of rows written."""
+    delete = MonthlyRollup.query
+    if user_id is not None:
+        delete = delete.filter_by(user_id=user_id)
+    delete.delete(synchronize_session=False)
+
+    return (
+        _rebuild_kind(db, Expense, EXPENSE, user_id)
+        + _rebuild_kind(db, Income, INCOME, user_id)
+    )
+
+
+def expense_deltas(rows):
+    """
+    Aggregate (month, category) deltas per user from (user_id, date, category,
+    amount, sign) tuples, for bulk operations.
+    """
+    deltas = defaultdict(lambda: defaultdict(lambda: [0.0, 0]))
+    for user_id, day, category, amount, sign in rows:
+        entry = deltas[int(user_id)][(month_start(day), category)]
+        entry[0] += sign * amount
+        entry[1] += sign
+    return deltas
@@ -0,0 +1,194 @@
+import re
+
+from sqlalchemy import Text, cast, column, func, literal_column, or_, table, text
+
+from app.models import Expense
+
+# Text search configuration for the Postgres tsvector index
+SEARCH_CONFIG = 'english'
+
+# Search terms honoured per query; the rest are ignored
+MAX_TERMS = 8
+
+_TERM = re.compile(r'\w+')
+
+_backends = {}  # engine -> detected backend
+
+_fts = table('expenses_fts', column('rowid'), column('rank'))
+
+
+def _sqlite_item_names(items):
+    # Space-separated item names from a JSON list of {"name": ...} objects
+    # and/or plain strings, so JSON keys and prices are never indexed
+    return (
+        "(SELECT group_concat(CASE type WHEN 'object' THEN json_extract(value, '$.name') "
+        "WHEN 'text' THEN value END, ' ') "
+        f"FROM json_each(CASE WHEN json_valid({items}) THEN {items} ELSE '[]' END))"
+    )
+
+
+# Contentless FTS5 table over the searchable expense text, with `items`
+# reduced to the item names. The triggers keep it in sync with every write
+# to `expenses`, including executemany inserts and set-based UPDATE/DELETE
+# statements.
+_SQLITE_DDL = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS expenses_fts USING fts5(
+        store, items, raw_ocr_text, content=''
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS expenses_fts_ai AFTER INSERT ON expenses BEGIN
+        INSERT INTO expenses_fts(rowid, store, items, raw_ocr_text)
+        VALUES (new.id, new.store, {_sqlite_item_names('new.items')}, new.raw_ocr_text);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS expenses_fts_ad AFTER DELETE ON expenses BEGIN
+        INSERT INTO expenses_fts(expenses_fts, rowid, store, items, raw_ocr_text)
+        VALUES ('delete', old.id, old.store, {_sqlite_item_names('old.items')}, old.raw_ocr_text);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS expenses_fts_au AFTER UPDATE OF store, items, raw_ocr_text ON expenses BEGIN
+        INSERT INTO expenses_fts(expenses_fts, rowid, store, items, raw_ocr_text)
+        VALUES ('delete', old.id, old.store, {_sqlite_item_names('old.items')}, old.raw_ocr_text);
+        INSERT INTO expenses_fts(rowid, store, items, raw_ocr_text)
+        VALUES (new.id, new.store, {_sqlite_item_names('new.items')}, new.raw_ocr_text);
+    END
+    """,
+)
+
+_SQLITE_DROP = (
+    'DROP TRIGGER IF EXISTS expenses_fts_ai',
+    'DROP TRIGGER IF EXISTS expenses_fts_ad',
+    'DROP TRIGGER IF EXISTS expenses_fts_au',
+    'DROP TABLE IF EXISTS expenses_fts',
+)
+
+_SQLITE_FILL = f"""
+    INSERT INTO expenses_fts(rowid, store, items, raw_ocr_text)
+    SELECT id, store, {_sqlite_item_names('items')}, raw_ocr_text FROM expenses
+"""
+
+
+def _postgres_item_names(items):
+    # Item names as JSON arrays of text: names of object items, then plain
+    # string items. Immutable, so it can sit in the index expression.
+    return (
+        f"jsonb_path_query_array(CAST({items} AS JSONB), '$[*].name')::text || ' ' || "
+        f"jsonb_path_query_array(CAST({items} AS JSONB), '$[*] ? (@.type() == \"string\")')::text"
+    )
+
+
+# Expression index: Postgres maintains it on every write, and queries that
+# use the identical expression (see _document) are served from it
+_POSTGRES_DDL = (
+    f"""
+    CREATE INDEX IF NOT EXISTS ix_expenses_search ON expenses USING GIN (
+        to_tsvector('{SEARCH_CONFIG}', coalesce(store, '') || ' ' || coalesce({_postgres_item_names('items')}, '') || ' ' || coalesce(raw_ocr_text, ''))
+    )
+    """,
+)
+
+_POSTGRES_DROP = (
+    'DROP INDEX IF EXISTS ix_expenses_search',
+)
+
+
+def _detect_backend(conn):
+    if conn.dialect.name == 'postgresql':
+        return 'tsvector'
+    if conn.dialect.name == 'sqlite':
+        if conn.execute(text("SELECT sqlite_compileoption_used('ENABLE_FTS5')")).scalar():
+            return 'fts5'
+    return None
+
+
+def search_backend(db):
+    """'fts5', 'tsvector', or None when the database has no full-text index."""
+    engine = db.engine
+    if engine not in _backends:
+        with engine.connect() as conn:
+            _backends[engine] = _detect_backend(conn)
+    return _backends[engine]
+
+
+def create_search_index(conn):
+    """
+    Create the full-text index and its sync triggers on `conn` (run by the
+    schema migrations). Rows already stored are indexed as part of this.
+    """
+    backend = _detect_backend(conn)
+    if backend == 'tsvector':
+        for statement in _POSTGRES_DDL:
+            conn.execute(text(statement))
+    elif backend == 'fts5':
+        for statement in _SQLITE_DDL:
+            conn.execute(text(statement))
+        conn.execute(text(_SQLITE_FILL))
+
+
+def drop_search_index(conn):
+    """Drop what create_search_index created, so a migration can rebuild it."""
+    backend = _detect_backend(conn)
+    statements = {'tsvector': _POSTGRES_DROP, 'fts5': _SQLITE_DROP}.get(backend, ())
+    for statement in statements:
+        conn.execute(text(statement))
+
+
+def search_terms(q):
+    """Lower-cased word terms of a free-text query, at most MAX_TERMS."""
+    return _TERM.findall((q or '').lower())[:MAX_TERMS]
+
+
+def _item_names(dialect):
+    """Searchable text of `items` (the item names) for LIKE matching and tsvector."""
+    if dialect == 'postgresql':
+        return literal_column(f"({_postgres_item_names('expenses.items')})")
+    if dialect == 'sqlite':
+        return literal_column(_sqlite_item_names('expenses.items'))
+    return cast(Expense.items, Text)
+
+
+def _document():
+    # Must match the ix_expenses_search expression exactly
+    space = literal_column("' '")
+    empty = literal_column("''")
+    return func.to_tsvector(
+        literal_column(f"'{SEARCH_CONFIG}'"),
+        func.coalesce(Expense.store, empty).op('||')(space)
+        .op('||')(func.coalesce(_item_names('postgresql'), empty)).op('||')(space)
+        .op('||')(func.coalesce(Expense.raw_ocr_text, empty)),
+    )
+
+
+def apply_search(query, db, terms):
+    """
+    Restrict an Expense query to rows matching every term (as a prefix) and
+    order it best match first, newest first among equal ranks. Without a
+    full-text index the terms are matched with LIKE and ordered by date.
+    """
+    backend = search_backend(db)
+    if backend == 'fts5':
+        match = ' '.join(f'"{term}"*' for term in terms)
+        return (
+            query.join(_fts, _fts.c.rowid == Expense.id)
+            .filter(literal_column('expenses_fts').op('MATCH')(match))
+            .order_by(_fts.c.rank, Expense.date.desc(), Expense.id.desc())
+        )
+    if backend == 'tsvector':
+        document = _document()
+        tsquery = func.to_tsquery(literal_column(f"'{SEARCH_CONFIG}'"), ' & '.join(f'{term}:*' for term in terms))
+        return (
+            query.filter(document.op('@@')(tsquery))
+            .order_by(func.ts_rank(document, tsquery).desc(), Expense.date.desc(), Expense.id.desc())
+        )
+    item_names = _item_names(db.engine.dialect.name)
+    for term in terms:
+        query = query.filter(or_(
+            Expense.store.icontains(term, autoescape=True),
+            item_names.icontains(term, autoescape=True),
+            Expense.raw_ocr_text.icontains(term, autoescape=True),
+        ))
+    return query.order_by(Expense.date.desc(), Expense.id.desc())
@@ -61,6 +61,12 @@ class SimpleExpenseCategorizer:
         
         description_lower = description.lower().strip()
         
+        # Resolve OCR spellings ("wal mart") to the canonical merchant keyword
+        from app.services.merchant_index import get_merchant_index
+        merchant = get_merchant_index().lookup(description, strict=False)
+        if merchant:
+            description_lower = f"{description_lower} {merchant.lower()}"
+        
         # Score each category
         category_scores = {}
         for category, keywords in self.category_keywords.items():
@@ -3,6 +3,8 @@ import os
 import re
 from datetime import datetime
 
+from app.services.merchant_index import get_merchant_index
+
 class SimpleOCRService:
     def __init__(self):
         print("Initializing Simple OCR Service (Mock)")
@@ -76,7 +78,7 @@ class SimpleOCRService:
         import random
         return random.choice(mock_receipts)
     
-    def extract_structured_data(self, text):
+    def extract_structured_data(self, text, merchant_index=None):
         """
         Enhanced structured data extraction from OCR text
         """
@@ -111,6 +113,19 @@ class SimpleOCRService:
             if result['store'] != 'Unknown Store':
                 break
         
+        # Normalize noisy store names to a canonical merchant, falling back
+        # to the merchant index when no pattern matched
+        if merchant_index is None:
+            merchant_index = get_merchant_index()
+        if result['store'] != 'Unknown Store':
+            result['store'] = merchant_index.canonicalize(result['store'])
+        else:
+            for line in lines[:5]:
+                merchant = merchant_index.lookup(line)
+                if merchant:
+                    result['store'] = merchant
+                    break
+        
         # Extract total amount
         amount_patterns = [
             r'TOTAL\s*\$?([0-9]+\.?[0-9]*)',
@@ -176,7 +191,7 @@ class SimpleOCRService:
         
         return result
     
-    def process_receipt(self, image_path):
+    def process_receipt(self, image_path, merchant_index=None):
         """
         Main processing function with mock OCR
         """
@@ -188,7 +203,7 @@ class SimpleOCRService:
             print(f"Mock extracted text: {extracted_text[:100]}...")
             
             # Extract structured data
-            structured_data = self.extract_structured_data(extracted_text)
+            structured_data = self.extract_structured_data(extracted_text, merchant_index)
             
             structured_data['raw_text'] = extracted_text
             structured_data['processing_status'] = 'success'
@@ -0,0 +1,162 @@
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import func, insert, literal, select, update
+
+from app.fieldsets import select_fields, serialize_rows
+from app.models import Budget, CategoryBudget, Expense, Income, Subscription, SyncChange, UserDataVersion
+
+# Synced collections, in response order
+ENTITIES = {
+    'expenses': Expense,
+    'incomes': Income,
+    'subscriptions': Subscription,
+    'budgets': Budget,
+    'category_budgets': CategoryBudget,
+}
+_ENTITY_NAMES = {model: name for name, model in ENTITIES.items()}
+
+# Change-log entries read per /sync request
+SYNC_LIMIT = 1000
+
+
+def _reserve_sequences(db, user_id, count):
+    """
+    Reserve `count` change-log sequences for the user and return the last
+    one handed out before them. The user's counter row stays locked until
+    the caller's transaction ends, so writers of one user take sequences and
+    commit one after another: a client that has seen a sequence has seen
+    every earlier one.
+    """
+    last = db.session.execute(
+        update(UserDataVersion)
+        .where(UserDataVersion.user_id == user_id)
+        .values(sync_sequence=UserDataVersion.sync_sequence + count, updated_at=UserDataVersion.updated_at)
+        .returning(UserDataVersion.sync_sequence - count)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+    if last is None:
+        db.session.execute(insert(UserDataVersion).values(user_id=user_id, version=0, sync_sequence=count))
+        last = 0
+    return last
+
+
+def _advance_sequence(db, user_id, sequence):
+    db.session.execute(
+        update(UserDataVersion)
+        .where(UserDataVersion.user_id == user_id)
+        .values(sync_sequence=sequence, updated_at=UserDataVersion.updated_at)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def record(db, *rows, deleted=False):
+    """
+    Log ORM rows as changed (or deleted) in the caller's transaction. Call
+    before `db.session.delete` for deletes; new rows are flushed for their id.
+    """
+    if any(row.id is None for row in rows):
+        db.session.flush()
+    record_ids(db, [(row.user_id, _ENTITY_NAMES[type(row)], row.id) for row in rows], deleted=deleted)
+
+
+def record_ids(db, changes, deleted=False):
+    """Log (user_id, entity, entity_id) triples with one executemany INSERT."""
+    if not changes:
+        return
+    by_user = defaultdict(list)
+    for user_id, entity, entity_id in changes:
+        by_user[int(user_id)].append((entity, entity_id))
+
+    now = datetime.utcnow()
+    rows = []
+    for user_id, entries in by_user.items():
+        first = _reserve_sequences(db, user_id, len(entries)) + 1
+        rows.extend(
+            {
+                'user_id': user_id,
+                'sequence': sequence,
+                'entity': entity,
+                'entity_id': entity_id,
+                'deleted': deleted,
+                'changed_at': now,
+            }
+            for sequence, (entity, entity_id) in enumerate(entries, first)
+        )
+    db.session.execute(insert(SyncChange), rows)
+
+
+def record_selected(db, user_id, model, condition, deleted=False):
+    """Log every `model` row of the user matching `condition` with one INSERT ... SELECT."""
+    user_id = int(user_id)
+    # Lock the counter first; the number of rows is only known afterwards
+    last = _reserve_sequences(db, user_id, 0)
+    logged = db.session.execute(
+        insert(SyncChange).from_select(
+            ['user_id', 'sequence', 'entity', 'entity_id', 'deleted', 'changed_at'],
+            select(
+                model.user_id, literal(last) + func.row_number().over(order_by=model.id),
+                literal(_ENTITY_NAMES[model]), model.id, literal(deleted), literal(datetime.utcnow()),
+            ).where(model.user_id == user_id, condition),
+        )
+    ).rowcount
+    _advance_sequence(db, user_id, last + logged)
+
+
+def latest_sequence(db, user_id):
+    """Sequence of the user's newest committed change-log entry (0 before the first)."""
+    return db.session.execute(
+        select(func.max(SyncChange.sequence)).where(SyncChange.user_id == int(user_id))
+    ).scalar() or 0
+
+
+def _empty():
+    return {name: {'upserted': [], 'deleted': []} for name in ENTITIES}
+
+
+def full_snapshot(db, user_id):
+    """Every synced row of the user, with the cursor to continue from."""
+    user_id = int(user_id)
+    # Read the cursor first: a write racing the snapshot is sent again next time
+    cursor = latest_sequence(db, user_id)
+    result = _empty()
+    for name, model in ENTITIES.items():
+        query = model.query.filter(model.user_id == user_id).order_by(model.id)
+        result[name]['upserted'] = serialize_rows(select_fields(query, model).all(), model)
+    return {'cursor': str(cursor), 'full': True, 'has_more': False, **result}
+
+
+def changes_since(db, user_id, since, limit=SYNC_LIMIT):
+    """
+    Rows created, updated or deleted after change `since`, reading at most
+    `limit` log entries. Several changes to one row collapse into its
+    current state or a tombstone; `has_more` asks the client to call again
+    with the returned cursor.
+    """
+    user_id = int(user_id)
+    log = db.session.execute(
+        select(SyncChange.sequence, SyncChange.entity, SyncChange.entity_id, SyncChange.deleted)
+        .where(SyncChange.user_id == user_id, SyncChange.sequence > since)
+        .order_by(SyncChange.sequence)
+        .limit(limit + 1)
+    ).all()
+    has_more = len(log) > limit
+    log = log[:limit]
+
+    latest = {}
+    for _, entity, entity_id, deleted in log:
+        latest[entity, entity_id] = deleted
+
+    result = _empty()
+    for name, model in ENTITIES.items():
+        changed = [entity_id for (entity, entity_id), deleted in latest.items() if entity == name and not deleted]
+        result[name]['deleted'] = sorted(
+            entity_id for (entity, entity_id), deleted in latest.items() if entity == name and deleted
+        )
+        if changed:
+            # A row missing here was deleted after this page; its tombstone follows
+            query = model.query.filter(model.user_id == user_id, model.id.in_(changed)).order_by(model.id)
+            result[name]['upserted'] = serialize_rows(select_fields(query, model).all(), model)
+
+    cursor = log[-1][0] if log else since
+    return {'cursor': str(cursor), 'full': False, 'has_more': has_more, **result}
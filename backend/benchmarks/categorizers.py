@@ -0,0 +1,331 @@
+"""
+Categorizer accuracy and throughput benchmark.
+
+Generates a labeled synthetic receipt corpus (merchant + items, with
+OCR-style noise), runs every available categorizer engine over it, and
+reports throughput, latency percentiles, memory and a confusion matrix.
+Results are written as JSON so engines can be compared across releases.
+
+Usage (from the backend directory):
+    python -m benchmarks.categorizers
+    python -m benchmarks.categorizers --engines simple --size 20000
+    python -m benchmarks.categorizers --compare old.json new.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+
+# Canonical label set; engine-specific labels are mapped onto it
+CATEGORIES = ['Food', 'Transport', 'Shopping', 'Bills', 'Healthcare', 'Entertainment', 'Other']
+LABEL_ALIASES = {'Travel': 'Transport'}
+
+CORPUS = {
+    'Food': {
+        'merchants': ['Walmart', 'Kroger', 'Safeway', 'Starbucks', "McDonald's", 'Subway',
+                      'Pizza Hut', 'Whole Foods Market', 'Trader Joes', 'Corner Bakery Cafe'],
+        'items': ['bananas', 'milk', 'bread', 'chicken breast', 'coffee', 'burger meal',
+                  'salad', 'eggs', 'orange juice', 'bagel'],
+    },
+    'Transport': {
+        'merchants': ['Shell', 'Chevron', 'Exxon', 'Uber', 'Lyft', 'City Parking',
+                      'Metro Transit', 'BP Gas Station', 'Yellow Taxi'],
+        'items': ['unleaded fuel', 'trip fare', 'parking 2h', 'diesel', 'car wash', 'toll'],
+    },
+    'Shopping': {
+        'merchants': ['Amazon', 'Best Buy', 'Nike', 'Adidas', "Macy's", 'eBay',
+                      'Apple Store', 'Westfield Mall'],
+        'items': ['running shoes', 'usb cable', 'headphones', 't-shirt', 'jeans', 'phone case'],
+    },
+    'Bills': {
+        'merchants': ['Verizon', 'Comcast', 'AT&T', 'City Water Utility', 'State Farm Insurance',
+                      'Electric Company'],
+        'items': ['monthly plan', 'internet service', 'electricity bill', 'premium', 'rent'],
+    },
+    'Healthcare': {
+        'merchants': ['CVS Pharmacy', 'Walgreens', 'Downtown Dental Clinic', 'General Hospital',
+                      'Family Doctor'],
+        'items': ['prescription', 'ibuprofen', 'checkup', 'vitamins', 'bandages'],
+    },
+    'Entertainment': {
+        'merchants': ['Netflix', 'Spotify', 'AMC Cinema', 'Ticketmaster', 'Steam Games',
+                      'City Theater'],
+        'items': ['subscription', 'movie ticket', 'concert ticket', 'popcorn', 'game'],
+    },
+    'Other': {
+        'merchants': ['Post Office', 'Dry Cleaners', 'Hardware Depot', 'Pet Supplies Plus',
+                      'Florist'],
+        'items': ['stamps', 'shirt pressing', 'screws', 'dog food', 'roses'],
+    },
+}
+
+_OCR_CONFUSIONS = {'o': '0', 'l': '1', 's': '5', 'e': 'c', 'b': '8', 'i': 'l'}
+_OUTLET_SUFFIXES = ['', '', ' STORE', ' SUPERCENTR', ' #1234', ' INC', ' T-0567']
+
+
+def _ocr_noise(text, rng, rate):
+    chars = list(text)
+    out = []
+    for ch in chars:
+        roll = rng.random()
+        if roll < rate * 0.25:
+            continue  # dropped character
+        if roll < rate * 0.5 and ch.lower() in _OCR_CONFUSIONS:
+            out.append(_OCR_CONFUSIONS[ch.lower()])
+            continue
+        if roll < rate * 0.6 and ch == ' ':
+            continue  # merged words ("WAL MART" -> "WALMART")
+        out.append(ch)
+        if roll > 1 - rate * 0.1:
+            out.append(' ')  # split word ("WALMART" -> "WAL MART")
+    return ''.join(out)
+
+
+def build_corpus(size=5000, noise=0.15, seed=42):
+    """Return a list of {'store', 'items', 'text', 'label'} samples."""
+    rng = random.Random(seed)
+    samples = []
+    labels = list(CORPUS)
+    for _ in range(size):
+        label = rng.choice(labels)
+        spec = CORPUS[label]
+        store = rng.choice(spec['merchants']) + rng.choice(_OUTLET_SUFFIXES)
+        if rng.random() < 0.5:
+            store = store.upper()
+        items = rng.sample(spec['items'], k=rng.randint(0, min(3, len(spec['items']))))
+        store = _ocr_noise(store, rng, noise)
+        items = [_ocr_noise(item, rng, noise) for item in items]
+        samples.append({
+            'store': store,
+            'items': items,
+            'text': ' '.join([store] + items),
+            'label': label,
+        })
+    return samples
+
+
+class SimpleEngine:
+    name = 'simple'
+
+    def __init__(self):
+        from app.services.simple_ml_service import SimpleExpenseCategorizer
+        self.engine = SimpleExpenseCategorizer()
+
+    def predict_one(self, sample):
+        return self.engine.categorize_expense(sample['text'])['category']
+
+    def predict_batch(self, samples):
+        rows = self.engine.bulk_categorize([{'description': s['text']} for s in samples])
+        return [row['category'] for row in rows]
+
+
+class MLEngine:
+    name = 'ml'
+
+    def __init__(self):
+        from app.services.ml_service import ExpenseCategorizer
+        self.engine = ExpenseCategorizer()
+
+    def predict_one(self, sample):
+        return self.engine.categorize_expense(sample['store'], sample['items'])['predicted_category']
+
+    def predict_batch(self, samples):
+        # Same preprocessing as predict_one, so only the prediction call differs
+        rows = self.engine.categorize_batch([(s['store'], s['items']) for s in samples])
+        return [row['predicted_category'] for row in rows]
+
+
+ENGINES = {'simple': SimpleEngine, 'ml': MLEngine}
+
+
+def _confusion(labels, predictions):
+    matrix = {true: {pred: 0 for pred in CATEGORIES} for true in CATEGORIES}
+    for true, pred in zip(labels, predictions):
+        pred = LABEL_ALIASES.get(pred, pred)
+        if pred not in matrix[true]:
+            pred = 'Other'
+        matrix[true][pred] += 1
+
+    per_category = {}
+    for category in CATEGORIES:
+        tp = matrix[category][category]
+        predicted = sum(matrix[true][category] for true in CATEGORIES)
+        actual = sum(matrix[category].values())
+        precision = tp / predicted if predicted else 0.0
+        recall = tp / actual if actual else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        per_category[category] = {
+            'precision': round(precision, 4),
+            'recall': round(recall, 4),
+            'f1': round(f1, 4),
+            'support': actual,
+        }
+
+    correct = sum(matrix[c][c] for c in CATEGORIES)
+    return matrix, per_category, correct / max(len(labels), 1)
+
+
+def _measure_memory(engine_cls, corpus, batch_size):
+    # Traced separately: tracemalloc slows allocation-heavy code several-fold
+    tracemalloc.start()
+    engine = engine_cls()
+    for offset in range(0, len(corpus), batch_size):
+        engine.predict_batch(corpus[offset:offset + batch_size])
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak_bytes
+
+
+def run_engine(engine_cls, corpus, batch_size=256):
+    load_started = time.perf_counter()
+    engine = engine_cls()
+    load_seconds = time.perf_counter() - load_started
+
+    latencies = np.empty(len(corpus))
+    predictions = []
+    for i, sample in enumerate(corpus):
+        started = time.perf_counter()
+        predictions.append(engine.predict_one(sample))
+        latencies[i] = time.perf_counter() - started
+    single_seconds = float(latencies.sum())
+
+    batch_predictions = []
+    batch_started = time.perf_counter()
+    for offset in range(0, len(corpus), batch_size):
+        batch_predictions.extend(engine.predict_batch(corpus[offset:offset + batch_size]))
+    batch_seconds = time.perf_counter() - batch_started
+    # The speedup is only meaningful when both paths compute the same thing
+    if batch_predictions != predictions:
+        raise RuntimeError(f'{engine_cls.name}: batch predictions differ from single predictions')
+
+    peak_bytes = _measure_memory(engine_cls, corpus, batch_size)
+
+    labels = [sample['label'] for sample in corpus]
+    matrix, per_category, accuracy = _confusion(labels, predictions)
+    latencies_us = latencies * 1e6
+
+    return {
+        'engine': engine_cls.name,
+        'accuracy': round(accuracy, 4),
+        'throughput': {
+            'single_per_second': round(len(corpus) / single_seconds, 1) if single_seconds else None,
+            'batch_per_second': round(len(corpus) / batch_seconds, 1) if batch_seconds else None,
+            'batch_size': batch_size,
+        },
+        'latency_us': {
+            'p50': round(float(np.percentile(latencies_us, 50)), 1),
+            'p95': round(float(np.percentile(latencies_us, 95)), 1),
+            'p99': round(float(np.percentile(latencies_us, 99)), 1),
+            'max': round(float(latencies_us.max()), 1),
+        },
+        'memory': {
+            'peak_traced_mb': round(peak_bytes / 1024 / 1024, 2),
+            'load_seconds': round(load_seconds, 3),
+        },
+        'per_category': per_category,
+        'confusion_matrix': matrix,
+    }
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _print_result(result):
+    print(f"\n== {result['engine']} ==")
+    print(f"accuracy          {result['accuracy'] * 100:.1f}%")
+    print(f"single preds/s    {result['throughput']['single_per_second']}")
+    print(f"batch preds/s     {result['throughput']['batch_per_second']} (batch={result['throughput']['batch_size']})")
+    latency = result['latency_us']
+    print(f"latency us        p50={latency['p50']} p95={latency['p95']} p99={latency['p99']}")
+    print(f"peak memory MB    {result['memory']['peak_traced_mb']}")
+    print('confusion (rows=true, cols=predicted)')
+    print(' ' * 14 + ''.join(f'{c[:6]:>8}' for c in CATEGORIES))
+    for true in CATEGORIES:
+        row = result['confusion_matrix'][true]
+        print(f'{true:<14}' + ''.join(f'{row[pred]:>8}' for pred in CATEGORIES))
+
+
+def compare(old_path, new_path):
+    with open(old_path) as f:
+        old = {r['engine']: r for r in json.load(f)['results']}
+    with open(new_path) as f:
+        new = {r['engine']: r for r in json.load(f)['results']}
+    for engine in sorted(set(old) & set(new)):
+        a, b = old[engine], new[engine]
+        print(f'\n== {engine} ==')
+        rows = [
+            ('accuracy', a['accuracy'], b['accuracy']),
+            ('single/s', a['throughput']['single_per_second'], b['throughput']['single_per_second']),
+            ('batch/s', a['throughput']['batch_per_second'], b['throughput']['batch_per_second']),
+            ('p99 us', a['latency_us']['p99'], b['latency_us']['p99']),
+            ('peak MB', a['memory']['peak_traced_mb'], b['memory']['peak_traced_mb']),
+        ]
+        for label, before, after in rows:
+            delta = f'{(after - before) / before * 100:+.1f}%' if before else 'n/a'
+            print(f'{label:<10}{before:>12}{after:>12}{delta:>10}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark expense categorizers.')
+    parser.add_argument('--engines', default=','.join(ENGINES), help='Comma-separated engine names.')
+    parser.add_argument('--size', type=int, default=5000, help='Number of synthetic samples.')
+    parser.add_argument('--noise', type=float, default=0.15, help='Per-character OCR noise rate.')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--output', help='Result file (default: benchmarks/results/<timestamp>.json).')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='Compare two saved result files.')
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return 0
+
+    corpus = build_corpus(size=args.size, noise=args.noise, seed=args.seed)
+    results = []
+    for name in [n.strip() for n in args.engines.split(',') if n.strip()]:
+        engine_cls = ENGINES.get(name)
+        if engine_cls is None:
+            print(f'Unknown engine: {name}', file=sys.stderr)
+            continue
+        try:
+            result = run_engine(engine_cls, corpus, batch_size=args.batch_size)
+        except ImportError as e:
+            print(f'Skipping {name}: {e}', file=sys.stderr)
+            continue
+        _print_result(result)
+        results.append(result)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"categorizers-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({
+            'created_at': datetime.now().isoformat(),
+            'git_revision': _git_revision(),
+            'python': platform.python_version(),
+            'corpus': {'size': args.size, 'noise': args.noise, 'seed': args.seed},
+            'results': results,
+        }, f, indent=2)
+    print(f'\nSaved results to {output}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,71 @@
+import pytest
+from flask_jwt_extended import create_access_token
+
+from app import create_app, db as _db
+from app.models import User
+
+
+def make_app(path, monkeypatch):
+    """App on the SQLite database at `path`, uploads stored next to it."""
+    monkeypatch.setenv('DATABASE_URL', f'sqlite:///{path}')
+    monkeypatch.setenv('UPLOAD_FOLDER', str(path.parent / 'uploads'))
+    monkeypatch.setenv('JWT_SECRET_KEY', 'test-jwt-secret-key-of-at-least-32-bytes')
+    app = create_app()
+    app.config['TESTING'] = True
+    return app
+
+
+def close_app(app):
+    with app.app_context():
+        _db.session.remove()
+        _db.engine.dispose()
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """App on a fresh SQLite database in a temporary directory."""
+    app = make_app(tmp_path / 'test.db', monkeypatch)
+    yield app
+    close_app(app)
+
+
+@pytest.fixture
+def db(app):
+    with app.app_context():
+        yield _db
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def user(app):
+    """(user_id, Authorization headers) for a new user."""
+    with app.app_context():
+        user = User(name='Test', email='test@example.com')
+        user.set_password('password123')
+        _db.session.add(user)
+        _db.session.commit()
+        token = create_access_token(identity=str(user.id))
+        return user.id, {'Authorization': f'Bearer {token}'}
+
+
+def count_statements(engine):
+    """Attach a counter of executed statements to `engine`; returns (counter, detach)."""
+    from sqlalchemy import event
+
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', record)
+    return statements, lambda: event.remove(engine, 'before_cursor_execute', record)
+
+
+def query_plan(db, statement, parameters=()):
+    """Detail lines of SQLite's EXPLAIN QUERY PLAN for a statement."""
+    rows = db.session.connection().exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters)
+    return [row[3] for row in rows]
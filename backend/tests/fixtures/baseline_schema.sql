@@ -0,0 +1,89 @@
+-- Schema of a database created by the baseline release (db.create_all() of
+-- its models on SQLite), before any schema migration existed.
+
+CREATE TABLE users (
+	id INTEGER NOT NULL,
+	name VARCHAR(100) NOT NULL,
+	email VARCHAR(120) NOT NULL,
+	password_hash VARCHAR(255) NOT NULL,
+	created_at DATETIME,
+	PRIMARY KEY (id),
+	UNIQUE (email)
+);
+
+CREATE TABLE expenses (
+	id INTEGER NOT NULL,
+	user_id INTEGER NOT NULL,
+	store VARCHAR(200) NOT NULL,
+	amount FLOAT NOT NULL,
+	category VARCHAR(50) NOT NULL,
+	date DATE NOT NULL,
+	items TEXT,
+	raw_ocr_text TEXT,
+	created_at DATETIME,
+	PRIMARY KEY (id),
+	FOREIGN KEY(user_id) REFERENCES users (id)
+);
+
+CREATE TABLE subscriptions (
+	id INTEGER NOT NULL,
+	user_id INTEGER NOT NULL,
+	name VARCHAR(200) NOT NULL,
+	amount FLOAT NOT NULL,
+	frequency VARCHAR(20) NOT NULL,
+	renewal_date DATE NOT NULL,
+	created_at DATETIME,
+	PRIMARY KEY (id),
+	FOREIGN KEY(user_id) REFERENCES users (id)
+);
+
+CREATE TABLE budgets (
+	id INTEGER NOT NULL,
+	user_id INTEGER NOT NULL,
+	monthly_limit FLOAT NOT NULL,
+	currency VARCHAR(10),
+	created_at DATETIME,
+	updated_at DATETIME,
+	PRIMARY KEY (id),
+	UNIQUE (user_id),
+	FOREIGN KEY(user_id) REFERENCES users (id)
+);
+
+CREATE TABLE incomes (
+	id INTEGER NOT NULL,
+	user_id INTEGER NOT NULL,
+	source VARCHAR(150) NOT NULL,
+	category VARCHAR(50) NOT NULL,
+	amount FLOAT NOT NULL,
+	date DATE NOT NULL,
+	is_recurring BOOLEAN,
+	notes TEXT,
+	created_at DATETIME,
+	PRIMARY KEY (id),
+	FOREIGN KEY(user_id) REFERENCES users (id)
+);
+
+CREATE TABLE category_budgets (
+	id INTEGER NOT NULL,
+	user_id INTEGER NOT NULL,
+	category VARCHAR(50) NOT NULL,
+	monthly_limit FLOAT NOT NULL,
+	created_at DATETIME,
+	updated_at DATETIME,
+	PRIMARY KEY (id),
+	CONSTRAINT uq_user_category_budget UNIQUE (user_id, category),
+	FOREIGN KEY(user_id) REFERENCES users (id)
+);
+
+CREATE TABLE categorization_feedback (
+	id INTEGER NOT NULL,
+	user_id INTEGER NOT NULL,
+	expense_id INTEGER NOT NULL,
+	original_category VARCHAR(50) NOT NULL,
+	corrected_category VARCHAR(50) NOT NULL,
+	confidence FLOAT,
+	created_at DATETIME,
+	PRIMARY KEY (id),
+	FOREIGN KEY(user_id) REFERENCES users (id),
+	FOREIGN KEY(expense_id) REFERENCES expenses (id)
+);
@@ -0,0 +1,51 @@
+from datetime import date
+
+from sqlalchemy import event, func, select
+from sqlalchemy.dialects import postgresql
+
+from app.models import Expense
+from app.services.aggregation import month_bucket
+from app.services.prediction_service import PredictionService
+from conftest import query_plan
+
+
+def test_month_bucket_groups_by_month(db, user):
+    user_id, _ = user
+    for day, amount in [(date(2024, 1, 1), 1), (date(2024, 1, 31), 2), (date(2024, 2, 1), 4), (date(2024, 3, 15), 8)]:
+        db.session.add(Expense(user_id=user_id, store='X', amount=amount, category='Food', date=day))
+    db.session.commit()
+
+    month = month_bucket(Expense.date, date(2024, 1, 1), date(2024, 3, 31)).label('month')
+    rows = db.session.execute(
+        select(month, func.sum(Expense.amount))
+        .where(Expense.user_id == user_id, Expense.date >= date(2024, 1, 1), Expense.date < date(2024, 4, 1))
+        .group_by(month).order_by(month)
+    ).all()
+    assert rows == [(date(2024, 1, 1), 3), (date(2024, 2, 1), 4), (date(2024, 3, 1), 8)]
+
+
+def test_prediction_query_uses_date_index(db, user):
+    user_id, _ = user
+    queries = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if 'FROM expenses' in statement:
+            queries.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        PredictionService.predict_next_month_spending(user_id, db)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+    assert len(queries) == 1, queries
+    plan = query_plan(db, *queries[0])
+    assert any(step.startswith('SEARCH expenses USING') and 'ix_expenses_user_date_id' in step for step in plan), plan
+    assert not any(step.startswith('SCAN expenses') for step in plan), plan
+
+
+def test_month_bucket_postgresql_uses_date_trunc():
+    month = month_bucket(Expense.date, date(2024, 1, 1), date(2024, 6, 30))
+    sql = str(select(month).compile(dialect=postgresql.dialect()))
+    assert "date_trunc('month', expenses.date)" in sql
+    assert 'CASE' not in sql
@@ -0,0 +1,38 @@
+from datetime import date
+
+from sqlalchemy import event
+
+from app.models import CategorizationFeedback, Expense
+from app.services.backfill_service import RecategorizationBackfill
+from conftest import query_plan
+
+
+def test_backfill_skips_corrected_expenses_through_index(db, user):
+    user_id, _ = user
+    expenses = [
+        Expense(user_id=user_id, store=store, amount=5, category='Other', date=date(2024, 1, 1))
+        for store in ('Starbucks', 'Shell', 'Walmart')
+    ]
+    db.session.add_all(expenses)
+    db.session.flush()
+    db.session.add(CategorizationFeedback(
+        user_id=user_id, expense_id=expenses[0].id, original_category='Food', corrected_category='Other',
+    ))
+    db.session.commit()
+
+    job = RecategorizationBackfill(db, user_id=user_id)
+    queries = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        queries.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        rows = job._fetch_chunk(0)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+    assert [row.id for row in rows] == [expenses[1].id, expenses[2].id]
+    plan = query_plan(db, *queries[-1])
+    assert any('categorization_feedback' in step and 'ix_categorization_feedback_expense' in step for step in plan), plan
+    assert not any(step.startswith('SCAN categorization_feedback') for step in plan), plan
@@ -0,0 +1,69 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import event
+
+from app.models import CategorizationFeedback
+
+
+@pytest.mark.parametrize('payload', [
+    {'filter': {'store': 5}},
+    {'filter': {'category': ['Food']}},
+    {'filter': {'min_amount': True}},
+    {'filter': {'max_amount': {'lt': 3}}},
+    {'filter': {'start_date': 'yesterday'}},
+    {'filter': ['store', 'X']},
+    {'filter': 'store=X'},
+    {'filter': {'colour': 'red'}},
+    {'ids': [1, 'two']},
+    {'ids': [None]},
+    {'ids': {'1': True}},
+    {},
+])
+def test_bulk_delete_rejects_malformed_selection(client, user, payload):
+    _, headers = user
+    response = client.post('/api/expenses/bulk-delete', json=payload, headers=headers)
+    assert response.status_code == 400, response.get_json()
+
+
+def test_bulk_update_by_filter(client, user):
+    _, headers = user
+    today = date.today().isoformat()
+    for store, amount in [('Amazon', 20), ('amazon ', 5), ('Corner Shop', 3)]:
+        client.post('/api/expenses', json={'store': store, 'amount': amount, 'category': 'Other', 'date': today}, headers=headers)
+
+    response = client.post('/api/expenses/bulk-update', json={
+        'filter': {'store': 'AMAZON', 'min_amount': 10}, 'category': 'Shopping',
+    }, headers=headers)
+    assert response.status_code == 200
+    assert response.get_json() == {'updated': 1}
+
+    categories = {e['store']: e['category'] for e in client.get('/api/expenses', headers=headers).get_json()['expenses']}
+    assert categories['Amazon'] == 'Shopping'
+    assert categories['amazon '] == 'Other'
+    assert categories['Corner Shop'] == 'Other'
+
+
+def test_bulk_delete_recategorized_expenses(db, client, user):
+    # Enforce foreign keys as Postgres does
+    event.listen(db.engine, 'connect', lambda conn, record: conn.execute('PRAGMA foreign_keys=ON'))
+    db.engine.dispose()
+
+    _, headers = user
+    today = date.today().isoformat()
+    for store in ('Amazon', 'Amazon', 'Corner Shop'):
+        client.post('/api/expenses', json={'store': store, 'amount': 5, 'category': 'Other', 'date': today}, headers=headers)
+    client.post('/api/expenses/bulk-update', json={'filter': {'store': 'amazon'}, 'category': 'Shopping'}, headers=headers)
+    assert CategorizationFeedback.query.count() == 2
+
+    response = client.post('/api/expenses/bulk-delete', json={'filter': {'category': 'Shopping'}}, headers=headers)
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json() == {'deleted': 2}
+    assert CategorizationFeedback.query.count() == 0
+    assert [e['store'] for e in client.get('/api/expenses', headers=headers).get_json()['expenses']] == ['Corner Shop']
+    # Single deletes of corrected expenses too
+    expense_id = client.get('/api/expenses', headers=headers).get_json()['expenses'][0]['id']
+    response = client.post(f'/api/expenses/{expense_id}/feedback', json={'correct_category': 'Food'}, headers=headers)
+    assert response.status_code in (200, 201) and CategorizationFeedback.query.count() == 1
+    assert client.delete(f'/api/expenses/{expense_id}', headers=headers).status_code == 200
+    assert CategorizationFeedback.query.count() == 0
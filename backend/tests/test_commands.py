@@ -0,0 +1,25 @@
+from datetime import date
+
+import pytest
+
+from app.services.data_version import get_data_version
+
+
+@pytest.mark.parametrize('command', ['rebuild-rollups', 'score-anomalies'])
+def test_maintenance_commands_invalidate_cached_responses(app, db, client, user, command):
+    user_id, headers = user
+    client.post('/api/expenses', json={
+        'store': 'X', 'amount': 10, 'category': 'Food', 'date': date.today().isoformat(),
+    }, headers=headers)
+    etag = client.get('/api/dashboard', headers=headers).headers['ETag']
+    version = get_data_version(user_id, db)
+
+    for args in ([command], [command, '--user-id', str(user_id)]):
+        result = app.test_cli_runner().invoke(args=args)
+        assert result.exit_code == 0, result.output
+        db.session.expire_all()
+        assert get_data_version(user_id, db) == version + 1
+        version += 1
+
+    response = client.get('/api/dashboard', headers={**headers, 'If-None-Match': etag})
+    assert response.status_code == 200
@@ -0,0 +1,27 @@
+from datetime import date
+
+from conftest import count_statements
+
+
+def test_dashboard_round_trips(app, db, client, user):
+    user_id, headers = user
+    today = date.today().isoformat()
+    for amount, category in [(10, 'Food'), (25.5, 'Food'), (40, 'Transport')]:
+        client.post('/api/expenses', json={'store': 'X', 'amount': amount, 'category': category, 'date': today}, headers=headers)
+    client.post('/api/incomes', json={'source': 'Job', 'amount': 1000, 'date': today, 'category': 'Salary'}, headers=headers)
+    client.put('/api/budget', json={'monthly_limit': 500}, headers=headers)
+    client.put('/api/budget/categories', json={'category_budgets': [{'category': 'Food', 'monthly_limit': 100}]}, headers=headers)
+
+    statements, detach = count_statements(db.engine)
+    try:
+        response = client.get('/api/dashboard', headers=headers)
+    finally:
+        detach()
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['totals']['expenses'] == 75.5
+    assert body['totals']['income'] == 1000
+    assert body['budget']['monthly_limit'] == 500
+    # Data version (ETag), rollup summary, budgets: independent of ledger size
+    assert len(statements) == 3, statements
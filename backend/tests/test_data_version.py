@@ -0,0 +1,27 @@
+from app.services.data_version import VersionedCache
+
+
+def test_versioned_cache_byte_budget():
+    cache = VersionedCache(maxsize=10, maxbytes=10)
+    cache.set('a', 1, b'x' * 4)
+    cache.set('b', 1, b'x' * 4)
+    assert cache.get('a', 1) is not None  # 'b' is now least recently used
+    cache.set('c', 1, b'x' * 4)
+    assert cache.get('b', 1) is None
+    assert cache.get('a', 1) is not None and cache.get('c', 1) is not None
+
+    # Replacing an entry frees its old size
+    cache.set('a', 2, b'x' * 6)
+    assert cache.get('a', 2) is not None and cache.get('c', 1) is not None
+    # A value over the whole budget is not kept
+    cache.set('d', 1, b'x' * 11)
+    assert [cache.get(key, version) for key, version in [('a', 2), ('c', 1), ('d', 1)]] == [None, None, None]
+    cache.set('e', 1, b'x' * 10)
+    assert cache.get('e', 1) is not None
+
+
+def test_versioned_cache_misses_newer_version():
+    cache = VersionedCache(maxsize=2)
+    cache.set('key', 1, {'total': 3})
+    assert cache.get('key', 1) == {'total': 3}
+    assert cache.get('key', 2) is None
@@ -0,0 +1,65 @@
+from datetime import date
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.models import Expense, User
+from app.services import merchant_index
+from app.services.merchant_index import MerchantIndex, get_user_merchant_index
+from conftest import close_app, make_app
+
+
+def _other_user(db):
+    other = User(name='Other', email='other@example.com')
+    other.set_password('password123')
+    db.session.add(other)
+    db.session.commit()
+    return other.id
+
+
+def test_user_index_holds_only_that_users_stores(db, client, user):
+    user_id, headers = user
+    other_id = _other_user(db)
+    client.post('/api/expenses', json={
+        'store': 'Blue Bottle Coffee Roasters', 'amount': 3, 'category': 'Food', 'date': '2024-01-02',
+    }, headers=headers)
+
+    assert get_user_merchant_index(db, user_id).lookup('BLUE BOTTLE COFEE ROASTERS') == 'Blue Bottle Coffee Roasters'
+    assert get_user_merchant_index(db, other_id).lookup('BLUE BOTTLE COFEE ROASTERS') is None
+    # Both fall back to the shared categorizer keywords
+    assert get_user_merchant_index(db, other_id).lookup('WAL MART SUPERCENTR') == 'Walmart'
+
+
+def test_user_index_is_built_from_history_on_first_use(db, user):
+    user_id, _ = user
+    db.session.add(Expense(user_id=user_id, store='Tartine Bakery', amount=4, category='Food', date=date(2024, 1, 1)))
+    db.session.commit()
+    merchant_index._user_indexes.clear()
+
+    assert get_user_merchant_index(db, user_id).lookup('TARTINE BAKRY') == 'Tartine Bakery'
+
+
+def test_create_app_does_not_read_the_ledger(tmp_path, monkeypatch):
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    close_app(make_app(tmp_path / 'test.db', monkeypatch))
+    # A restart on a migrated database (every CLI command, worker, ...);
+    # listening on every engine, since create_app makes its own
+    event.listen(Engine, 'before_cursor_execute', record)
+    try:
+        app = make_app(tmp_path / 'test.db', monkeypatch)
+    finally:
+        event.remove(Engine, 'before_cursor_execute', record)
+    close_app(app)
+    assert statements
+    assert not [s for s in statements if 'FROM expenses' in s]
+
+
+def test_index_bounds():
+    index = MerchantIndex(max_merchants=2, max_keys=3)
+    assert [index.add(name) for name in ('Walmart', 'Target', 'Costco')] == ['Walmart', 'Target', None]
+    assert index.add('Walmart Supercenter') == 'Walmart'
+    assert index.add('Costco') is None and len(index) == 2
@@ -0,0 +1,175 @@
+import sqlite3
+from datetime import date
+from pathlib import Path
+
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event, text
+
+from app import db as _db
+from app.migrations import MIGRATIONS, run_migrations
+from conftest import close_app, make_app, query_plan
+
+BASELINE_SCHEMA = Path(__file__).parent / 'fixtures' / 'baseline_schema.sql'
+
+# Data already stored when the database is upgraded
+BASELINE_DATA = """
+INSERT INTO users (id, name, email, password_hash, created_at) VALUES (1, 'Old', 'old@example.com', '', '2024-01-01');
+INSERT INTO expenses (id, user_id, store, amount, category, date, items, raw_ocr_text, created_at)
+VALUES (1, 1, 'Old Coffee Shop', 3, 'Food', '2024-01-01', '[{"name": "Latte", "price": 3}]', NULL, '2024-01-01');
+INSERT INTO expenses (user_id, store, amount, category, date, created_at) VALUES
+    (1, 'Rent Co', 60, 'Bills', date('now', 'start of month'), '2024-01-01'),
+    (1, 'Grocer', 30, 'Food', date('now', 'start of month'), '2024-01-01');
+INSERT INTO incomes (user_id, source, category, amount, date, is_recurring, created_at)
+VALUES (1, 'Job', 'Salary', 1000, date('now', 'start of month'), 0, '2024-01-01');
+INSERT INTO budgets (user_id, monthly_limit, currency, created_at, updated_at) VALUES (1, 80, 'USD', '2024-01-01', '2024-01-01');
+INSERT INTO category_budgets (user_id, category, monthly_limit, created_at, updated_at) VALUES (1, 'Food', 100, '2024-01-01', '2024-01-01');
+"""
+
+
+@pytest.fixture
+def legacy_app(tmp_path, monkeypatch):
+    """App started on a database created by the baseline release."""
+    path = tmp_path / 'legacy.db'
+    conn = sqlite3.connect(path)
+    conn.executescript(BASELINE_SCHEMA.read_text())
+    conn.executescript(BASELINE_DATA)
+    conn.commit()
+    conn.close()
+    app = make_app(path, monkeypatch)
+    yield app
+    close_app(app)
+
+
+@pytest.fixture
+def headers(legacy_app):
+    with legacy_app.app_context():
+        return {'Authorization': f"Bearer {create_access_token(identity='1')}"}
+
+
+def _indexes(db):
+    return {row[0] for row in db.session.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'"))}
+
+
+def _captured(db, client, url, headers, table):
+    """(statement, parameters) of each SELECT on `table` issued while serving `url`."""
+    queries = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT') and f'FROM {table}' in statement:
+            queries.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        response = client.get(url, headers=headers)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    assert response.status_code == 200, response.get_json()
+    assert queries, f'no query on {table} for {url}'
+    return queries
+
+
+def _assert_searches(plan, table, index):
+    assert any(step.startswith(f'SEARCH {table} ') and f'INDEX {index} ' in step for step in plan), plan
+    assert not any(step.startswith(f'SCAN {table}') for step in plan), plan
+
+
+def test_legacy_database_is_migrated(legacy_app):
+    with legacy_app.app_context():
+        indexes = _indexes(_db)
+        assert {
+            'ix_expenses_user_date_id', 'ix_incomes_user_date_id',
+            'ix_expenses_user_category_date', 'ix_subscriptions_user_renewal',
+            'ix_categorization_feedback_expense',
+        } <= indexes
+
+        versions = {row[0] for row in _db.session.execute(text('SELECT version FROM schema_migrations'))}
+        assert versions == {version for version, _, _ in MIGRATIONS}
+        # Rows stored before the search index existed are searchable
+        assert _db.session.execute(text("SELECT rowid FROM expenses_fts WHERE expenses_fts MATCH 'coffee'")).all() == [(1,)]
+        assert _db.session.execute(text("SELECT rowid FROM expenses_fts WHERE expenses_fts MATCH 'price'")).all() == []
+        assert run_migrations(_db) == []
+
+
+def test_upgrade_rebuilds_month_totals(legacy_app, headers):
+    client = legacy_app.test_client()
+    totals = client.get('/api/dashboard', headers=headers).get_json()['totals']
+    assert totals['expenses'] == 90
+    assert totals['income'] == 1000
+
+    client.post('/api/expenses', json={
+        'store': 'Cafe', 'amount': 5, 'category': 'Food', 'date': date.today().isoformat(),
+    }, headers=headers)
+    assert client.get('/api/dashboard', headers=headers).get_json()['totals']['expenses'] == 95
+
+
+def test_upgrade_evaluates_budget_alerts(legacy_app, headers):
+    client = legacy_app.test_client()
+    response = client.get('/api/alerts', headers=headers)
+    assert response.status_code == 200
+    alerts = response.get_json()['alerts']
+    # Over the overall budget (90 of 80), well under the Food one (30 of 100)
+    assert [alert.get('category') for alert in alerts] == [None]
+    assert alerts[0]['percentage'] == 112.5
+
+
+def test_upgrade_scores_existing_expenses(legacy_app):
+    from app.models import CategoryAmountStats, ExpenseAnomaly
+    with legacy_app.app_context():
+        assert ExpenseAnomaly.query.filter_by(user_id=1).count() == 3
+        stats = {row.category: row.count for row in CategoryAmountStats.query.filter_by(user_id=1)}
+        assert stats == {'Food': 2, 'Bills': 1}
+
+
+@pytest.mark.parametrize('url, table, index', [
+    ('/api/expenses', 'expenses', 'ix_expenses_user_date_id'),
+    ('/api/expenses?limit=10&cursor=', 'expenses', 'ix_expenses_user_date_id'),
+    ('/api/expenses?category=Food&start_date=2024-01-01', 'expenses', 'ix_expenses_user_category_date'),
+    ('/api/incomes?start_date=2024-01-01', 'incomes', 'ix_incomes_user_date_id'),
+    ('/api/subscriptions', 'subscriptions', 'ix_subscriptions_user_renewal'),
+])
+def test_list_queries_use_indexes(legacy_app, headers, url, table, index):
+    client = legacy_app.test_client()
+    with legacy_app.app_context():
+        for statement, parameters in _captured(_db, client, url, headers, table):
+            _assert_searches(query_plan(_db, statement, parameters), table, index)
+
+
+def test_keyset_page_uses_index(legacy_app, headers):
+    client = legacy_app.test_client()
+    with legacy_app.app_context():
+        for i in range(3):
+            client.post('/api/expenses', json={
+                'store': f'Shop {i}', 'amount': 1, 'category': 'Food', 'date': date(2024, 2, i + 1).isoformat(),
+            }, headers=headers)
+        cursor = client.get('/api/expenses?limit=1', headers=headers).get_json()['next_cursor']
+        assert cursor
+        for statement, parameters in _captured(_db, client, f'/api/expenses?limit=1&cursor={cursor}', headers, 'expenses'):
+            _assert_searches(query_plan(_db, statement, parameters), 'expenses', 'ix_expenses_user_date_id')
+
+
+def test_dashboard_queries_use_indexes(legacy_app, headers):
+    client = legacy_app.test_client()
+    with legacy_app.app_context():
+        queries = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            queries.append((statement, parameters))
+
+        event.listen(_db.engine, 'before_cursor_execute', record)
+        try:
+            response = client.get('/api/dashboard', headers=headers)
+        finally:
+            event.remove(_db.engine, 'before_cursor_execute', record)
+        assert response.status_code == 200
+
+        plan = [step for statement, parameters in queries for step in query_plan(_db, statement, parameters)]
+        assert not [step for step in plan if step.startswith('SCAN ')], plan
+        for table, index in [
+            ('user_data_versions', 'INTEGER PRIMARY KEY'),
+            # uq_monthly_rollup (user_id, month, category, kind)
+            ('monthly_rollups', 'sqlite_autoindex_monthly_rollups_1'),
+            ('budgets', 'sqlite_autoindex_budgets_1'),
+            ('category_budgets', 'sqlite_autoindex_category_budgets_1'),
+        ]:
+            assert any(step.startswith(f'SEARCH {table} USING') and index in step for step in plan), (table, plan)
@@ -0,0 +1,47 @@
+from datetime import date, timedelta
+
+import pytest
+from werkzeug.datastructures import MultiDict
+
+from app.pagination import DEFAULT_LIMIT, MAX_LIMIT, page_args
+
+
+@pytest.mark.parametrize('limit', ['abc', '1.5', '0', '-3', ' '])
+def test_page_args_rejects_invalid_limit(limit):
+    with pytest.raises(ValueError):
+        page_args(MultiDict({'limit': limit}))
+
+
+def test_page_args_limits():
+    assert page_args(MultiDict()) is None
+    assert page_args(MultiDict({'limit': '10'})) == (10, None)
+    assert page_args(MultiDict({'limit': ''})) == (DEFAULT_LIMIT, None)
+    assert page_args(MultiDict({'limit': '100000'})) == (MAX_LIMIT, None)
+
+
+@pytest.mark.parametrize('url', ['/api/expenses', '/api/incomes'])
+def test_invalid_limit_is_a_bad_request(client, user, url):
+    _, headers = user
+    response = client.get(f'{url}?limit=abc', headers=headers)
+    assert response.status_code == 400
+    assert response.get_json() == {'message': 'limit must be a positive integer'}
+
+
+def test_keyset_pages_cover_every_expense_once(client, user):
+    _, headers = user
+    start = date(2024, 1, 1)
+    for i in range(7):
+        # Two expenses per day, so pages split rows sharing a date
+        client.post('/api/expenses', json={
+            'store': f'Shop {i}', 'amount': 1, 'category': 'Food', 'date': (start + timedelta(days=i // 2)).isoformat(),
+        }, headers=headers)
+
+    seen, cursor = [], ''
+    while True:
+        body = client.get(f'/api/expenses?limit=3&cursor={cursor}', headers=headers).get_json()
+        seen += [e['id'] for e in body['expenses']]
+        cursor = body['next_cursor']
+        if cursor is None:
+            break
+    all_ids = [e['id'] for e in client.get('/api/expenses', headers=headers).get_json()['expenses']]
+    assert sorted(seen) == sorted(all_ids) and len(seen) == 7
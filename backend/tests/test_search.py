@@ -0,0 +1,56 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from app.services import search_service
+
+ITEMS = [{'name': 'Oat Milk', 'price': 2.5, 'quantity': 1}, 'Sourdough']
+
+
+@pytest.fixture(params=['index', 'like'])
+def search(request, client, user, monkeypatch):
+    """`q` -> matching stores, through the full-text index or the LIKE fallback."""
+    if request.param == 'like':
+        monkeypatch.setattr(search_service, 'search_backend', lambda db: None)
+    _, headers = user
+    today = date.today().isoformat()
+    for store, items in [('Green Grocer', ITEMS), ('Fuel Stop', None), ('Corner Shop', [{'name': 'Name Tags'}])]:
+        client.post('/api/expenses', json={
+            'store': store, 'amount': 5, 'category': 'Food', 'date': today, 'items': items,
+        }, headers=headers)
+
+    def run(q):
+        response = client.get('/api/expenses', query_string={'q': q}, headers=headers)
+        assert response.status_code == 200
+        return [e['store'] for e in response.get_json()['expenses']]
+    return run
+
+
+def test_search_matches_item_names(search):
+    assert search('milk') == ['Green Grocer']
+    assert search('sourdough') == ['Green Grocer']
+    assert search('tags') == ['Corner Shop']
+
+
+def test_search_ignores_item_keys_and_values(search):
+    assert search('price') == []
+    assert search('quantity') == []
+    assert search('name') == ['Corner Shop']
+    assert search('2.5') == []
+
+
+def test_search_follows_item_updates(db, search):
+    from app.models import Expense
+    expense = Expense.query.filter_by(store='Green Grocer').one()
+    expense.items = [{'name': 'Rye Bread'}]
+    db.session.commit()
+    assert search('milk') == []
+    assert search('rye') == ['Green Grocer']
+
+
+def test_postgres_document_uses_item_names():
+    sql = str(select(search_service._document()).compile(dialect=postgresql.dialect()))
+    assert 'jsonb_path_query_array(CAST(expenses.items AS JSONB)' in sql
+    assert 'CAST(expenses.items AS TEXT)' not in sql
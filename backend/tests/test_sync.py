@@ -0,0 +1,81 @@
+import threading
+from datetime import date
+
+from flask_jwt_extended import create_access_token
+
+from app.models import Expense, SyncChange, User
+from app.services import sync_service
+
+
+def _expense(db, user_id, store):
+    expense = Expense(user_id=user_id, store=store, amount=5, category='Food', date=date.today())
+    db.session.add(expense)
+    db.session.flush()
+    return expense
+
+
+def test_cursor_follows_commit_order(app, db, user):
+    user_id, _ = user
+    # Writer A logs its change first but is slow to commit
+    first = _expense(db, user_id, 'First')
+    sync_service.record(db, first)
+
+    def writer_b():
+        with app.app_context():
+            sync_service.record(db, _expense(db, user_id, 'Second'))
+            db.session.commit()
+
+    thread = threading.Thread(target=writer_b)
+    thread.start()
+    thread.join(0.5)
+    # B cannot take a sequence, let alone commit, before A does
+    assert thread.is_alive()
+    assert sync_service.latest_sequence(db, user_id) == 1
+    db.session.commit()
+    thread.join()
+
+    # A client that synced right after A's commit still gets B's change
+    changes = sync_service.changes_since(db, user_id, 1)
+    assert [e['store'] for e in changes['expenses']['upserted']] == ['Second']
+    assert changes['cursor'] == '2'
+
+
+def test_cursor_does_not_depend_on_row_ids(db, user):
+    user_id, _ = user
+    sync_service.record(db, _expense(db, user_id, 'First'))
+    db.session.commit()
+    cursor = int(sync_service.full_snapshot(db, user_id)['cursor'])
+    sync_service.record(db, _expense(db, user_id, 'Second'))
+    db.session.commit()
+    # Number the second entry below the first, as a Postgres sequence does
+    # for a transaction that took its id early but committed late
+    SyncChange.query.filter_by(sequence=2).update({SyncChange.id: 0})
+    db.session.commit()
+
+    changes = sync_service.changes_since(db, user_id, cursor)
+    assert [e['store'] for e in changes['expenses']['upserted']] == ['Second']
+
+
+def test_sequences_are_per_user(db, client, user):
+    _, headers = user
+    other = User(name='Other', email='other@example.com')
+    other.set_password('password123')
+    db.session.add(other)
+    db.session.commit()
+    other_headers = {'Authorization': f'Bearer {create_access_token(identity=str(other.id))}'}
+
+    today = date.today().isoformat()
+    for headers_ in (headers, other_headers, headers):
+        client.post('/api/expenses', json={'store': 'Amazon', 'amount': 5, 'category': 'Other', 'date': today}, headers=headers_)
+    cursor = client.get('/api/sync', headers=headers).get_json()['cursor']
+    assert cursor == '2'
+    assert client.get('/api/sync', headers=other_headers).get_json()['cursor'] == '1'
+
+    # Bulk writes continue the same numbering
+    client.post('/api/expenses/bulk-update', json={'filter': {'store': 'amazon'}, 'category': 'Shopping'}, headers=headers)
+    response = client.get('/api/sync', query_string={'since': cursor}, headers=headers).get_json()
+    assert response['cursor'] == '4'
+    assert [e['category'] for e in response['expenses']['upserted']] == ['Shopping', 'Shopping']
+    assert sorted(SyncChange.query.with_entities(SyncChange.user_id, SyncChange.sequence).all()) == [
+        (1, 1), (1, 2), (1, 3), (1, 4), (2, 1),
+    ]